@@ -1,4 +1,7 @@
-import requests
+import threading
+import time
+from Transport import Transport
+from TokenStore import Token, TokenStore
 from typing import Optional
 
 
@@ -9,7 +12,10 @@ class Authenticator:
                  refresh_token: Optional[str],
                  auth_url: str,
                  access_token_url: str,
-                 redirect_uri: str = "https://example.com/callback"):
+                 redirect_uri: str = "https://example.com/callback",
+                 transport: Optional[Transport] = None,
+                 token_store: Optional[TokenStore] = None,
+                 refresh_margin: int = 300):
         self.client_id = client_id
         self.client_secret = client_secret
         self.auth_url = auth_url
@@ -17,17 +23,44 @@ class Authenticator:
         self.redirect_uri = redirect_uri
         self.refresh_token = refresh_token
         self.access_token = None
-        
-        self.get_access_token()
+        self.expires_at = 0
+        self.transport = transport if transport is not None else Transport()
+        self.token_store = token_store
+        self.refresh_margin = refresh_margin
+        self.lock = threading.Lock()
+
+        # Reuse a persisted token if it is still valid, otherwise refresh it now.
+        # An explicitly passed refresh token wins, so rotating credentials discards a stored token for another one
+        stored = token_store.load() if token_store is not None else None
+        if stored is not None and refresh_token is not None and stored.refresh_token != refresh_token:
+            stored = None
+        if stored is not None:
+            self.refresh_token = stored.refresh_token
+            self.access_token = stored.access_token
+            self.expires_at = stored.expires_at
+
+        if self.expired():
+            self.get_access_token()
+
+    def expired(self) -> bool:
+        return self.access_token is None or time.time() >= self.expires_at - self.refresh_margin
+
+    @property
+    def token(self) -> str:
+        # Refresh shortly before expiry; the lock stops concurrent callers refreshing twice
+        with self.lock:
+            if self.expired():
+                self.get_access_token()
+            return self.access_token
 
     def get_access_token(self) -> str:
         # Authenticate using Refresh Token if possible, otherwise prompt user to approve in browser
         if self.refresh_token is None:
-            res = requests.get(self.auth_url,
-                               params={"client_id": self.client_id,
-                                       "redirect_uri": self.redirect_uri,
-                                       "response_type": "code"},
-                               allow_redirects=False)
+            res = self.transport.get(self.auth_url,
+                                     params={"client_id": self.client_id,
+                                             "redirect_uri": self.redirect_uri,
+                                             "response_type": "code"},
+                                     allow_redirects=False)
             print(f"Visit this url to authorize and provide access code: {res.headers['Location']}")
             code = input("\nInput access code: ")
             grant_type = "authorization_code"
@@ -37,11 +70,17 @@ class Authenticator:
             grant_type = "refresh_token"
             code_type = "refresh_token"
 
-        res = requests.post(self.access_token_url,
-                            data={"grant_type": grant_type,
-                                  "redirect_uri": self.redirect_uri,
-                                  code_type: code},
-                            auth=(self.client_id, self.client_secret))
+        res = self.transport.post(self.access_token_url,
+                                  data={"grant_type": grant_type,
+                                        "redirect_uri": self.redirect_uri,
+                                        code_type: code},
+                                  auth=(self.client_id, self.client_secret))
         # Save access & refresh tokens
         self.refresh_token = res.json()['refresh_token']
         self.access_token = res.json()['access_token']
+        self.expires_at = time.time() + int(res.json().get('expires_in', 3600))
+
+        if self.token_store is not None:
+            self.token_store.save(Token(self.access_token, self.refresh_token, self.expires_at))
+
+        return self.access_token
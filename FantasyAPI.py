@@ -1,87 +1,245 @@
-import requests
 import pandas as pd
 import numpy as np
 import Authenticator
+from Transport import Transport
+from ResponseCache import ResponseCache
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from player import Player
-from typing import List
+from TeamWeek import TeamWeek
+from yahoo_xml import team_record, iter_players, iter_scoreboard_teams, iter_matchups
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Yahoo caps the players collection at 25 per page
+PAGE_SIZE = 25
+
+CHUNK_SIZE = 64 * 1024
+
+# Cache lifetimes (seconds) per resource type
+CACHE_TTL = {"game": 24 * 60 * 60,
+             "league": 5 * 60,
+             "scoreboard": 5 * 60,
+             "scoreboard_final": 7 * 24 * 60 * 60,
+             "players": 60 * 60}
+
+# Yahoo availability status filter for each ownership type
+OWNERSHIP_STATUS = {"freeagents": "FA",
+                    "waivers": "W",
+                    "team": "T"}
+
+
+def scoreboard_to_dict(scoreboard: ET.Element, prefix: str, xmlns: Dict) -> Dict:
+    # Get every team from every matchup on the scoreboard
+    teams = scoreboard.iterfind(f"{prefix}matchups/{prefix}matchup/{prefix}teams/{prefix}team", xmlns)
+
+    return dict(team_record(team) for team in teams)
 
 
 # REFACTOR:
 #   Make this an abstract class to account for other fantasy services
 class FantasyAPI:
-    def __init__(self, league_id: int, season: int, authenticator: Authenticator, week:int=None):
+    def __init__(self, league_id: int, season: int, authenticator: Authenticator, week:int=None, concurrency: int=16, transport: Transport=None, cache: Optional[ResponseCache]=None):
         self.league_id = league_id
-        self.access_token = authenticator.access_token
+        self.authenticator = authenticator
+        self.transport = transport if transport is not None else authenticator.transport
+        self.cache = cache
         self.PREFIX = "default:"
         self.XMLNS = {"default": "http://fantasysports.yahooapis.com/fantasy/v2/base.rng"}
         self.season = season
         self.week = week
-        self.players = self.get_players()
+        self.concurrency = concurrency
+        self._players = None
+
+    @property
+    def players(self) -> List[Player]:
+        # Only download the full roster the first time it is needed
+        if self._players is None:
+            self._players = self.get_players()
+        return self._players
+
+    def load_players(self, status: str=None, position: str=None, ownership_type: str=None) -> List[Player]:
+        # Filters are pushed into the Yahoo query; status is a Yahoo availability code (A, FA, W, T, K)
+        if ownership_type is not None:
+            if ownership_type not in OWNERSHIP_STATUS:
+                raise ValueError(f"Unknown ownership_type {ownership_type!r}, expected one of {sorted(OWNERSHIP_STATUS)}")
+            if status is not None and status != OWNERSHIP_STATUS[ownership_type]:
+                raise ValueError(f"status {status!r} conflicts with ownership_type {ownership_type!r}")
+            status = OWNERSHIP_STATUS[ownership_type]
+        filters = ""
+        if status:
+            filters += f";status={status}"
+        if position:
+            filters += f";position={position}"
+
+        players = self.get_players(filters=filters)
+        if not filters:
+            self._players = players
+        return players
+
+    @property
+    def access_token(self) -> str:
+        # Read through the authenticator so a refreshed token is picked up mid-run
+        return self.authenticator.token
+
+    def stream(self, url: str, ttl: float=0, refresh: bool=False) -> Iterator[bytes]:
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        entry = None
+        if self.cache is not None and not refresh:
+            entry = self.cache.get(url)
+            if entry is not None and entry.fresh:
+                yield entry.body
+                return
+            # Revalidate a stale copy instead of downloading it again
+            if entry is not None and entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry is not None and entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        res = self.transport.get(url, headers=headers, stream=True)
+        with res:
+            if res.status_code == 304 and entry is not None:
+                self.cache.refresh(url, ttl)
+                yield entry.body
+                return
+            res.raise_for_status()
+
+            # Hand chunks to the caller as they arrive, keeping a copy for the cache
+            chunks = []
+            for chunk in res.iter_content(CHUNK_SIZE):
+                chunks.append(chunk)
+                yield chunk
+
+        if self.cache is not None:
+            self.cache.put(url, b"".join(chunks), ttl, res.headers.get("ETag"), res.headers.get("Last-Modified"))
+
+    def request(self, url: str, ttl: float=0, refresh: bool=False) -> bytes:
+        return b"".join(self.stream(url, ttl, refresh))
 
     def get_game_key(self) -> str:
-        res = requests.get(f"https://fantasysports.yahooapis.com/fantasy/v2/games;game_codes=nba;seasons={self.season}",
-                           headers={"Authorization": f"Bearer {self.access_token}"})
-        root = ET.fromstring(res.content.decode('utf8'))
+        res = self.request(f"https://fantasysports.yahooapis.com/fantasy/v2/games;game_codes=nba;seasons={self.season}",
+                           CACHE_TTL["game"])
+        root = ET.fromstring(res.decode('utf8'))
 
         return root.find(f"{self.PREFIX}games", self.XMLNS).find(f"{self.PREFIX}game", self.XMLNS).find(f"{self.PREFIX}game_key", self.XMLNS).text
         
+    def get_league(self, game_key: str) -> ET.Element:
+        res = self.request(f'https://fantasysports.yahooapis.com/fantasy/v2/league/{game_key}.l.{self.league_id}',
+                           CACHE_TTL["league"])
+        root = ET.fromstring(res.decode('utf8'))
+
+        return root.find(f"{self.PREFIX}league", self.XMLNS)
+
     def get_current_week(self, game_key: str) -> int:
         if self.week:
             return self.week
 
-        res = requests.get(f'https://fantasysports.yahooapis.com/fantasy/v2/league/{game_key}.l.{self.league_id}',
-                           headers={"Authorization": f"Bearer {self.access_token}"})
-        root = ET.fromstring(res.content.decode('utf8'))
+        return int(self.get_league(game_key).find(f"{self.PREFIX}current_week", self.XMLNS).text) - 1
 
-        return int(root.find(f"{self.PREFIX}league", self.XMLNS).find(f"{self.PREFIX}current_week", self.XMLNS).text) - 1
-        
-    def get_scoreboard(self, game_key, week: int) -> str:
-        res = requests.get(f'https://fantasysports.yahooapis.com/fantasy/v2/league/{game_key}.l.{self.league_id}/scoreboard?week={str(week)}',
-                           headers={"Authorization": f"Bearer {self.access_token}"})
-        root = ET.fromstring(res.content.decode('utf8'))
+    def scoreboard_ttl(self, league: ET.Element, week: int) -> float:
+        # Finished weeks only change through stat corrections, so they are revalidated rarely
+        is_finished = league.find(f"{self.PREFIX}is_finished", self.XMLNS)
+        if is_finished is not None and is_finished.text == "1":
+            return CACHE_TTL["scoreboard_final"]
+        if week < int(league.find(f"{self.PREFIX}current_week", self.XMLNS).text):
+            return CACHE_TTL["scoreboard_final"]
+        return CACHE_TTL["scoreboard"]
+
+    def scoreboard_url(self, game_key: str, week: int) -> str:
+        return f'https://fantasysports.yahooapis.com/fantasy/v2/league/{game_key}.l.{self.league_id}/scoreboard?week={str(week)}'
+
+    def stream_scoreboard(self, game_key: str, week: int, ttl: Optional[float]=None, refresh: bool=False) -> Iterator[bytes]:
+        # Every scoreboard read goes through here, so the TTL and refresh policy lives in one place
+        if ttl is None:
+            ttl = self.scoreboard_ttl(self.get_league(game_key), week)
+        return self.stream(self.scoreboard_url(game_key, week), ttl, refresh)
+
+    def fetch_scoreboard(self, game_key: str, week: int, ttl: Optional[float]=None, refresh: bool=False) -> ET.Element:
+        root = ET.fromstring(b"".join(self.stream_scoreboard(game_key, week, ttl, refresh)).decode('utf8'))
 
         return root.find(f"{self.PREFIX}league", self.XMLNS).find(f"{self.PREFIX}scoreboard", self.XMLNS)
 
-    def get_players(self) -> List[Player]:
-        empty = False
-        start = 0
-        players = []
-        game_key = self.get_game_key()
-        while not empty:
-            res = requests.get(f'https://fantasysports.yahooapis.com/fantasy/v2/league/{game_key}.l.{self.league_id}/players;start={start}/ownership',
-                               headers={"Authorization": f"Bearer {self.access_token}"})
-            root = ET.fromstring(res.content.decode('utf8'))
-            xml_players = root.find(f"{self.PREFIX}league", self.XMLNS).find(f"{self.PREFIX}players", self.XMLNS)
-            if len(xml_players) == 0:
-                empty = True
-            else:
-                for xml_player in xml_players:
-                    name_xml = xml_player.find(f"{self.PREFIX}name", self.XMLNS)
-                    ownership_xml = xml_player.find(f"{self.PREFIX}ownership", self.XMLNS)
-                    name_dict = {item.tag.replace("{" + self.XMLNS["default"] + "}", ""): item.text for item in name_xml}
-                    ownership_dict = {item.tag.replace("{" + self.XMLNS["default"] + "}", ""): item.text for item in ownership_xml}
-                    player_dict = {item.tag.replace("{" + self.XMLNS["default"] + "}", ""): item.text for item in xml_player if item.tag.replace("{" + self.XMLNS["default"] + "}", "") not in ["name", "ownership"]}
-                    for k, v in name_dict.items():
-                        player_dict[k] = v
-                    for k, v in ownership_dict.items():
-                        player_dict[k] = v
-                    players.append(Player(player_dict["player_key"],
-                                          player_dict["first"],
-                                          player_dict["last"],
-                                          player_dict["editorial_team_full_name"],
-                                          player_dict["editorial_team_abbr"],
-                                          player_dict["uniform_number"],
-                                          player_dict["display_position"],
-                                          player_dict.get("status", ""),
-                                          player_dict["ownership_type"],
-                                          player_dict.get("owner_team_key", ""),
-                                          player_dict.get("owner_team_name", "")))
-
-                start += len(xml_players)
+    def get_scoreboard(self, game_key, week: int) -> ET.Element:
+        return self.fetch_scoreboard(game_key, week)
 
-        return players
+    def get_scoreboard_data(self, game_key: str, week: int, ttl: Optional[float]=None, refresh: bool=False) -> Dict:
+        return dict(iter_scoreboard_teams(self.stream_scoreboard(game_key, week, ttl, refresh)))
+
+    def get_scoreboard_table(self, game_key: str, week: int, ttl: Optional[float]=None, refresh: bool=False) -> TeamWeek:
+        return TeamWeek.from_records(iter_scoreboard_teams(self.stream_scoreboard(game_key, week, ttl, refresh)))
+
+    def get_matchups(self, game_key: str, week: int) -> Tuple[Dict, List[Tuple[str, ...]]]:
+        chunks = self.stream_scoreboard(game_key, week)
+
+        data = {}
+        matchups = []
+        for teams in iter_matchups(chunks):
+            data.update(teams)
+            matchups.append(tuple(team_id for team_id, _ in teams))
 
+        return data, matchups
 
+    def get_scoreboards(self, game_key: str, weeks: Iterable[int], table: bool=False, refresh: bool=False) -> Dict[int, Dict]:
+        # The scoreboard resource only takes a single week, so fan the weeks out concurrently
+        weeks = list(weeks)
+        if not weeks:
+            return {}
+        league = self.get_league(game_key)
 
+        fetch_week = self.get_scoreboard_table if table else self.get_scoreboard_data
+
+        def fetch(week: int) -> Dict:
+            return fetch_week(game_key, week, self.scoreboard_ttl(league, week), refresh)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(weeks)))) as executor:
+            return dict(zip(weeks, executor.map(fetch, weeks)))
+
+    def get_players_page(self, game_key: str, start: int, filters: str="") -> List[Player]:
+        chunks = self.stream(f'https://fantasysports.yahooapis.com/fantasy/v2/league/{game_key}.l.{self.league_id}/players;start={start};count={PAGE_SIZE}{filters}/ownership',
+                             CACHE_TTL["players"])
+
+        return [Player(player_dict["player_key"],
+                       player_dict["first"],
+                       player_dict["last"],
+                       player_dict["editorial_team_full_name"],
+                       player_dict["editorial_team_abbr"],
+                       player_dict["uniform_number"],
+                       player_dict["display_position"],
+                       player_dict.get("status", ""),
+                       player_dict["ownership_type"],
+                       player_dict.get("owner_team_key", ""),
+                       player_dict.get("owner_team_name", "")) for player_dict in iter_players(chunks)]
+
+    def get_players(self, concurrency: int=None, filters: str="") -> List[Player]:
+        concurrency = self.concurrency if concurrency is None else concurrency
+        game_key = self.get_game_key()
+
+        if concurrency <= 1:
+            players = []
+            start = 0
+            while True:
+                page = self.get_players_page(game_key, start, filters)
+                players.extend(page)
+                if len(page) < PAGE_SIZE:
+                    return players
+                start += PAGE_SIZE
+
+        # The collection size isn't exposed, so keep `concurrency` pages in flight
+        # and stop probing once a short (or empty) page marks the end
+        pages = {}
+        in_flight = {}
+        start = 0
+        end = None
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while in_flight or end is None:
+                while end is None and len(in_flight) < concurrency:
+                    in_flight[executor.submit(self.get_players_page, game_key, start, filters)] = start
+                    start += PAGE_SIZE
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page_start = in_flight.pop(future)
+                    pages[page_start] = future.result()
+                    if len(pages[page_start]) < PAGE_SIZE and (end is None or page_start < end):
+                        end = page_start
 
+        # Merge pages in order, ignoring speculative pages past the end
+        return [player for page_start in sorted(pages) if page_start <= end for player in pages[page_start]]
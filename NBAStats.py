@@ -1,14 +1,32 @@
+import os
+import numpy as np
 import pandas
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, time
 from nba_api.stats.endpoints.playergamelogs import PlayerGameLogs
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable
 
 
 class NBAStats:
 
-    def __init__(self, lookup: Dict[int, int], season: str):
+    def __init__(self, lookup: Dict[int, int], season: str, gamelogs: Optional[pandas.DataFrame]=None, store_path: Optional[str]=None):
         self.id_lookup = lookup
-        self.gamelogs = self.get_all_gamelogs(season)
+        if gamelogs is not None:
+            self.gamelogs = gamelogs
+        elif store_path is not None:
+            self.gamelogs = self.sync_gamelogs(season, store_path)
+        else:
+            self.gamelogs = self.get_all_gamelogs(season)
+        self.build_index()
+
+    def build_index(self) -> None:
+        # Sort once by player then date so each player's games are one contiguous slice
+        gamelogs = self.gamelogs.assign(GAME_DATETIME=pandas.to_datetime(self.gamelogs["GAME_DATE"]))
+        self.gamelogs = gamelogs.sort_values(["PLAYER_ID", "GAME_DATETIME"], kind="mergesort").reset_index(drop=True)
+        self.game_dates = self.gamelogs["GAME_DATETIME"].to_numpy()
+
+        player_ids, starts = np.unique(self.gamelogs["PLAYER_ID"].to_numpy(), return_index=True)
+        ends = np.append(starts[1:], len(self.gamelogs))
+        self.offsets = dict(zip(player_ids.tolist(), zip(starts.tolist(), ends.tolist())))
 
     def get_player_id(self, fantasy_player_id: str) -> int:
         return self.id_lookup.get(fantasy_player_id, 0)
@@ -17,8 +35,38 @@ class NBAStats:
     def get_all_gamelogs(season: str) -> pandas.DataFrame:
         return PlayerGameLogs(season_nullable=season).get_data_frames()[0]
 
+    @staticmethod
+    def sync_gamelogs(season: str, store_path: str) -> pandas.DataFrame:
+        try:
+            stored = pandas.read_csv(store_path, dtype={"GAME_ID": str})
+        except FileNotFoundError:
+            stored = None
+
+        if stored is None or stored.empty:
+            gamelogs = NBAStats.get_all_gamelogs(season)
+        else:
+            # Refetch from the last synced date so games still in progress then are updated
+            last_synced = pandas.to_datetime(stored["GAME_DATE"]).max()
+            new = PlayerGameLogs(season_nullable=season,
+                                 date_from_nullable=last_synced.strftime("%m/%d/%Y")).get_data_frames()[0]
+            gamelogs = (pandas.concat([stored, new], ignore_index=True)
+                              .drop_duplicates(["GAME_ID", "PLAYER_ID"], keep="last")
+                              .reset_index(drop=True))
+
+        os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+        tmp = f"{store_path}.tmp"
+        gamelogs.to_csv(tmp, index=False)
+        os.replace(tmp, store_path)
+
+        return gamelogs
+
     def get_player_gamelogs(self, fantasy_player_id: int, window: Optional[int]=None) -> pandas.DataFrame:
+        start, end = self.offsets.get(self.get_player_id(fantasy_player_id), (0, 0))
         if window:
-            return self.gamelogs[(self.gamelogs["PLAYER_ID"] == self.get_player_id(fantasy_player_id)) & (self.gamelogs["GAME_DATE"] > (date.today() - timedelta(days=window)))]
-        else:
-            return self.gamelogs[self.gamelogs["PLAYER_ID"] == self.get_player_id(fantasy_player_id)]
+            # Dates are sorted within the slice, so the window start is a binary search
+            cutoff = np.datetime64(datetime.combine(date.today() - timedelta(days=window), time()))
+            start += int(np.searchsorted(self.game_dates[start:end], cutoff, side="right"))
+        return self.gamelogs.iloc[start:end]
+
+    def get_players_gamelogs(self, fantasy_player_ids: Iterable[int], window: Optional[int]=None) -> Dict[int, pandas.DataFrame]:
+        return {fantasy_player_id: self.get_player_gamelogs(fantasy_player_id, window) for fantasy_player_id in fantasy_player_ids}
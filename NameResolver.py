@@ -0,0 +1,115 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+from nba_api.stats.static.players import get_players
+
+SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "v"}
+
+# Common short forms that aren't a prefix of the full first name
+NICKNAMES = {"bill": "william", "will": "william", "bob": "robert", "rob": "robert", "jim": "james",
+             "jimmy": "james", "mike": "michael", "danny": "daniel", "tony": "anthony", "johnny": "john"}
+
+# Fuzzy matches need this SequenceMatcher ratio against the normalised name, and this lead over the runner-up
+FUZZY_CUTOFF = 0.85
+FUZZY_MARGIN = 0.05
+PREFIX_LENGTH = 3
+
+
+def normalize_name(name: str) -> str:
+    # "Nikola Jokić", "P.J. Washington Jr." -> "nikola jokic", "pj washington"
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower()
+    name = re.sub(r"[.'`’]", "", name)
+    tokens = re.sub(r"[^a-z0-9]+", " ", name).split()
+    while len(tokens) > 1 and tokens[-1] in SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def split_name(name: str) -> Tuple[str, str]:
+    first, _, last = name.partition(" ")
+    return first, last
+
+
+def same_first_name(short: str, full: str) -> bool:
+    # "nic" / "nicolas", "bob" / "robert"
+    if NICKNAMES.get(short) == full or NICKNAMES.get(full) == short:
+        return True
+    return min(len(short), len(full)) >= PREFIX_LENGTH and (full.startswith(short) or short.startswith(full))
+
+
+class NameResolver:
+    def __init__(self, players: Optional[List[Dict]] = None):
+        # nba_api's static player list, active players first so they win name collisions
+        players = get_players() if players is None else players
+        players = sorted(players, key=lambda player: not player.get("is_active", False))
+
+        self.index = {}
+        for player in players:
+            self.index.setdefault(normalize_name(player["full_name"]), player["id"])
+
+        # Everything after the first name, so spelling and short-form variants are only tried within a family name
+        self.surnames = {}
+        for name in self.index:
+            first, last = split_name(name)
+            self.surnames.setdefault(last, []).append(first)
+
+    def unique(self, names: List[str]) -> Optional[int]:
+        # Several players with the same name variant are ambiguous, not a match
+        ids = {self.index[name] for name in names}
+        return ids.pop() if len(ids) == 1 else None
+
+    def short_form(self, name: str) -> Optional[int]:
+        first, last = split_name(name)
+        return self.unique([f"{candidate} {last}" for candidate in self.surnames.get(last, [])
+                            if same_first_name(first, candidate)])
+
+    def fuzzy(self, name: str) -> Optional[int]:
+        # Only a clear winner counts: above the cutoff and ahead of the next candidate by the margin
+        first, last = split_name(name)
+        scores = sorted(((SequenceMatcher(None, name, f"{candidate} {last}").ratio(), f"{candidate} {last}")
+                         for candidate in self.surnames.get(last, [])), reverse=True)
+        if not scores or scores[0][0] < FUZZY_CUTOFF:
+            return None
+        if len(scores) > 1 and scores[0][0] - scores[1][0] < FUZZY_MARGIN:
+            return None
+        return self.index[scores[0][1]]
+
+    def match(self, name: str) -> Tuple[Optional[int], bool]:
+        # NBA id and whether the name matched exactly; inexact matches are worth a look
+        key = normalize_name(name)
+        if key in self.index:
+            return self.index[key], True
+        nba_id = self.short_form(key)
+        if nba_id is None:
+            nba_id = self.fuzzy(key)
+        return nba_id, False
+
+    def resolve(self, name: str) -> Optional[int]:
+        return self.match(name)[0]
+
+    def resolve_many(self, names: Iterable[str]) -> Tuple[Dict[str, int], Dict[str, int], List[str]]:
+        exact = {}
+        inexact = {}
+        unresolved = []
+        for name in names:
+            nba_id, is_exact = self.match(name)
+            if nba_id is None:
+                unresolved.append(name)
+            else:
+                (exact if is_exact else inexact)[name] = nba_id
+        return exact, inexact, unresolved
+
+    def resolve_players(self, players: Iterable) -> Tuple[Dict[str, int], Dict[str, int], List]:
+        # Fantasy player id -> NBA player id for exact and inexact matches, plus the players nothing matched
+        exact = {}
+        inexact = {}
+        unresolved = []
+        for player in players:
+            nba_id, is_exact = self.match(f"{player.player_first_name} {player.player_last_name}")
+            if nba_id is None:
+                unresolved.append(player)
+            else:
+                (exact if is_exact else inexact)[player.fantasy_player_id] = nba_id
+        return exact, inexact, unresolved
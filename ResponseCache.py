@@ -0,0 +1,140 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# Read-only use still records access times; write them back at most this often (seconds)
+FLUSH_INTERVAL = 60
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    fresh: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ResponseCache:
+    def __init__(self, path: str = "./data/cache/yahoo", max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        self.index = self.load_index()
+        self.dirty = False
+        self.saved_at = time.time()
+        # Persist access times left over from reads, so LRU order survives restarts
+        atexit.register(self.flush)
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf8")).hexdigest()
+
+    def body_path(self, key: str) -> str:
+        return os.path.join(self.path, key)
+
+    def load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(os.path.join(self.path, "index.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_index(self) -> None:
+        tmp = os.path.join(self.path, f"index.json.{os.getpid()}.{threading.get_ident()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, os.path.join(self.path, "index.json"))
+        self.dirty = False
+        self.saved_at = time.time()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.dirty:
+                self.save_index()
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        key = self.key(url)
+        with self.lock:
+            meta = self.index.get(key)
+            if meta is None:
+                return None
+            try:
+                with open(self.body_path(key), "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                del self.index[key]
+                self.dirty = True
+                return None
+            meta["accessed"] = time.time()
+            self.dirty = True
+            if meta["accessed"] - self.saved_at > FLUSH_INTERVAL:
+                self.save_index()
+            return CacheEntry(body,
+                              time.time() < meta["stored"] + meta["ttl"],
+                              meta.get("etag"),
+                              meta.get("last_modified"))
+
+    def put(self, url: str, body: bytes, ttl: float, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        key = self.key(url)
+        with self.lock:
+            tmp = self.body_path(key) + f".{os.getpid()}.{threading.get_ident()}"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, self.body_path(key))
+            now = time.time()
+            self.index[key] = {"url": url,
+                               "stored": now,
+                               "accessed": now,
+                               "ttl": ttl,
+                               "size": len(body),
+                               "etag": etag,
+                               "last_modified": last_modified}
+            self.evict()
+            self.save_index()
+
+    def refresh(self, url: str, ttl: float) -> None:
+        # Server confirmed (304) that the cached body is still current
+        key = self.key(url)
+        with self.lock:
+            if key in self.index:
+                self.index[key]["stored"] = time.time()
+                self.index[key]["ttl"] = ttl
+                self.save_index()
+
+    def evict(self) -> None:
+        # Drop least recently used entries until the cache fits in max_bytes
+        total = sum(meta["size"] for meta in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["accessed"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.index.pop(key)["size"]
+            try:
+                os.remove(self.body_path(key))
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, url: str) -> None:
+        key = self.key(url)
+        with self.lock:
+            if self.index.pop(key, None) is not None:
+                try:
+                    os.remove(self.body_path(key))
+                except FileNotFoundError:
+                    pass
+                self.save_index()
+
+    def clear(self) -> None:
+        with self.lock:
+            for key in self.index:
+                try:
+                    os.remove(self.body_path(key))
+                except FileNotFoundError:
+                    pass
+            self.index = {}
+            self.save_index()
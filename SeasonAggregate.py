@@ -0,0 +1,85 @@
+import json
+import os
+from typing import Dict, List
+from TeamWeek import TeamWeek, SUM_FIELDS
+
+
+class SeasonAggregate:
+    def __init__(self, path: str):
+        self.path = path
+        self.weeks: List[int] = []
+        self.latest_week = 0
+        self.teams: Dict[str, Dict] = {}
+        # Per week input hash and each team's contribution, so a corrected week can be taken back out
+        self.hashes: Dict[str, str] = {}
+        self.week_sums: Dict[str, Dict[str, List]] = {}
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        if "hashes" not in stored:
+            # Written before weeks were tracked individually; start over so every week is fetched again
+            return
+        self.weeks = stored["weeks"]
+        self.latest_week = stored["latest_week"]
+        self.teams = stored["teams"]
+        self.hashes = stored["hashes"]
+        self.week_sums = stored["week_sums"]
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"weeks": self.weeks, "latest_week": self.latest_week, "teams": self.teams,
+                       "hashes": self.hashes, "week_sums": self.week_sums}, f)
+        os.replace(tmp, self.path)
+
+    def remove_week(self, week: int) -> None:
+        for team_id, values in self.week_sums.pop(str(week)).items():
+            sums = self.teams[team_id]["sums"]
+            for field, value in zip(SUM_FIELDS, values):
+                sums[field] -= value
+        del self.hashes[str(week)]
+        self.weeks.remove(week)
+
+    def add_week(self, week: int, data: TeamWeek) -> bool:
+        # Weeks already held are only revised when their inputs changed, e.g. after a stat correction
+        digest = data.digest()
+        if self.hashes.get(str(week)) == digest:
+            return False
+        if week in self.weeks:
+            self.remove_week(week)
+
+        # Names and team order follow the most recent week, as in agg_season_data
+        latest = week >= self.latest_week
+        contributions = {}
+        for team in data.values():
+            stored = self.teams.setdefault(team.team_id, {"order": 0, "name": team.name, "remaining": 0, "sums": dict.fromkeys(SUM_FIELDS, 0)})
+            contributions[team.team_id] = [team[field] for field in SUM_FIELDS]
+            for field in SUM_FIELDS:
+                stored["sums"][field] += team[field]
+            if latest:
+                stored["name"] = team.name
+                stored["remaining"] = team.remaining
+        if latest:
+            for order, team_id in enumerate(data.keys()):
+                self.teams[team_id]["order"] = order
+            self.latest_week = week
+
+        self.weeks = sorted(self.weeks + [week])
+        self.hashes[str(week)] = digest
+        self.week_sums[str(week)] = contributions
+        return True
+
+    def averages(self) -> TeamWeek:
+        team_ids = sorted(self.teams, key=lambda team_id: self.teams[team_id]["order"])
+        teams = [self.teams[team_id] for team_id in team_ids]
+        return TeamWeek.from_sums(team_ids,
+                                  [team["name"] for team in teams],
+                                  [team["remaining"] for team in teams],
+                                  {field: [team["sums"][field] for team in teams] for field in SUM_FIELDS},
+                                  len(self.weeks))
@@ -0,0 +1,132 @@
+import hashlib
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Tuple
+from yahoo_xml import stat_map
+
+# Scoring categories in Yahoo's stat order; made/attempted pairs become integer columns
+STAT_KEYS = [key for key in stat_map.values() if key not in ("fgma", "ftma")]
+COUNT_KEYS = [key for key in STAT_KEYS if key not in ("fgp", "ftp")]
+MADE_ATTEMPTED = {"fgma": ("fgm", "fga"), "ftma": ("ftm", "fta")}
+
+# Columns that add up across weeks
+SUM_FIELDS = ["fgm", "fga", "ftm", "fta"] + COUNT_KEYS + ["gp"]
+
+
+def team_dtype(id_len: int, name_len: int, gp_type: type = np.int64) -> np.dtype:
+    # Season averages carry fractional games played, weekly tables don't
+    return np.dtype([("team_id", f"U{max(id_len, 1)}"),
+                     ("name", f"U{max(name_len, 1)}"),
+                     ("fgm", np.int64),
+                     ("fga", np.int64),
+                     ("ftm", np.int64),
+                     ("fta", np.int64)]
+                    + [(key, np.float64) for key in STAT_KEYS]
+                    + [("gp", gp_type),
+                       ("remaining", np.int64)])
+
+
+class TeamRecord:
+    __slots__ = ("team_id", "name", "fgm", "fga", "ftm", "fta",
+                 "fgp", "ftp", "tpm", "pts", "reb", "ast", "st", "blk", "to",
+                 "gp", "remaining")
+
+    def __init__(self, row: np.void):
+        for field in self.__slots__:
+            setattr(self, field, row[field].item())
+
+    @property
+    def fgma(self) -> str:
+        return f"{self.fgm}/{self.fga}"
+
+    @property
+    def ftma(self) -> str:
+        return f"{self.ftm}/{self.fta}"
+
+    def __getitem__(self, key: str):
+        # Lets records stand in for the per-team dicts from scoreboard_to_dict
+        return getattr(self, key)
+
+
+class TeamWeek:
+    def __init__(self, table: np.ndarray):
+        self.table = table
+
+    @classmethod
+    def from_sums(cls, team_ids: List[str], names: List[str], remaining: List[int], sums: Dict[str, List], n_weeks: int) -> "TeamWeek":
+        # Season averages: percentages from made/attempted totals, everything else per week
+        table = np.zeros(len(team_ids), dtype=team_dtype(max((len(t) for t in team_ids), default=1),
+                                                         max((len(n) for n in names), default=1),
+                                                         np.float64))
+        table["team_id"] = team_ids
+        table["name"] = names
+        table["remaining"] = remaining
+        for field in ["fgm", "fga", "ftm", "fta"]:
+            table[field] = sums[field]
+        table["fgp"] = [round(m / a, 3) for m, a in zip(sums["fgm"], sums["fga"])]
+        table["ftp"] = [round(m / a, 3) for m, a in zip(sums["ftm"], sums["fta"])]
+        for cat in ["gp"] + COUNT_KEYS:
+            table[cat] = [round(x / n_weeks, 1) for x in sums[cat]]
+        return cls(table)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, Dict]], gp_type: type = np.int64) -> "TeamWeek":
+        records = list(records)
+        dtype = team_dtype(max((len(team_id) for team_id, _ in records), default=1),
+                           max((len(team["name"]) for _, team in records), default=1),
+                           gp_type)
+        table = np.zeros(len(records), dtype=dtype)
+        for i, (team_id, team) in enumerate(records):
+            row = table[i]
+            row["team_id"] = team_id
+            row["name"] = team["name"]
+            for key, (made, attempted) in MADE_ATTEMPTED.items():
+                row[made], row[attempted] = (int(x) for x in team[key].split("/"))
+            for key in STAT_KEYS:
+                row[key] = team[key]
+            row["gp"] = team["gp"]
+            row["remaining"] = team.get("remaining", 0)
+        return cls(table)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TeamWeek":
+        return cls.from_records(data.items())
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __getitem__(self, team_id: str) -> TeamRecord:
+        return TeamRecord(self.table[self.keys().index(team_id)])
+
+    def keys(self) -> List[str]:
+        return self.table["team_id"].tolist()
+
+    def values(self) -> List[TeamRecord]:
+        return [TeamRecord(row) for row in self.table]
+
+    def items(self) -> List[Tuple[str, TeamRecord]]:
+        return list(zip(self.keys(), self.values()))
+
+    @property
+    def names(self) -> List[str]:
+        return [name.encode('ascii', 'ignore').decode('ascii') for name in self.table["name"].tolist()]
+
+    def digest(self, salt: str = "") -> str:
+        # Content hash of the table, for spotting weeks whose inputs changed
+        digest = hashlib.sha256(f"{salt}:{self.table.dtype.descr}".encode())
+        digest.update(self.table.tobytes())
+        return digest.hexdigest()
+
+    def matrix(self, keys: List[str] = STAT_KEYS) -> np.ndarray:
+        return np.column_stack([self.table[key] for key in keys]).astype(float).reshape(len(self.table), len(keys))
+
+    def to_dict(self) -> Dict:
+        data = {}
+        for team in self.values():
+            tmp = {"name": team.name, "gp": team.gp, "remaining": team.remaining,
+                   "fgma": team.fgma, "ftma": team.ftma}
+            tmp.update({key: team[key] for key in STAT_KEYS})
+            data[team.team_id] = tmp
+        return data
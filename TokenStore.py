@@ -0,0 +1,42 @@
+import json
+import os
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+
+@dataclass
+class Token:
+    access_token: Optional[str]
+    refresh_token: str
+    expires_at: float = 0
+
+
+class TokenStore:
+    def __init__(self, path: str = "TOKEN.json", legacy_path: Optional[str] = "REFRESH_TOKEN"):
+        self.path = path
+        self.legacy_path = legacy_path
+
+    def load(self) -> Optional[Token]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return Token(**json.load(f))
+        except (FileNotFoundError, ValueError, TypeError):
+            pass
+
+        # Fall back to the plain refresh token file written by older versions
+        if self.legacy_path is None:
+            return None
+        try:
+            with open(self.legacy_path, encoding="utf-8") as f:
+                refresh_token = f.readline().strip()
+        except FileNotFoundError:
+            return None
+        return Token(None, refresh_token) if refresh_token else None
+
+    def save(self, token: Token) -> None:
+        # Write to a temporary file and swap it in so a crash never leaves a partial token
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(asdict(token), f)
+        os.replace(tmp, self.path)
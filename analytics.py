@@ -0,0 +1,119 @@
+import numpy as np
+from typing import Dict, List, Tuple, Union
+from TeamWeek import TeamWeek, STAT_KEYS
+
+# Flip turnovers so that higher is better in every category
+DIRECTION = np.array([1, 1, 1, 1, 1, 1, 1, 1, -1])
+
+# Counting stats are divided by games played in the per game variant, percentages are not
+PER_GAME = np.array([False, False, True, True, True, True, True, True, True])
+
+# MVP scales percentages up to comparable magnitudes and weights how hard each category is to swing
+MVP_SCALE = np.array([1000, 1000, 1, 1, 1, 1, 1, 1, -1])
+MVP_WEIGHTS = np.array([1, 1, 3, 1, 2, 2, 3, 3, 2])
+
+# Every subset of categories, for the exact MVP search
+SUBSETS = ((np.arange(2 ** len(STAT_KEYS))[:, None] >> np.arange(len(STAT_KEYS))) & 1).astype(bool)
+
+
+def ascii_name(name: str) -> str:
+    return name.encode('ascii', 'ignore').decode('ascii')
+
+
+def pack_stats(data: Union[Dict, TeamWeek], stat_keys: List[str]=STAT_KEYS) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    if isinstance(data, TeamWeek):
+        return data.names, data.matrix(stat_keys), data.table["gp"].astype(float)
+
+    teams = list(data.values())
+    names = [ascii_name(team["name"]) for team in teams]
+    stats = np.array([[float(team[key]) for key in stat_keys] for team in teams], dtype=float).reshape(len(teams), len(stat_keys))
+    gp = np.array([team["gp"] for team in teams], dtype=float)
+    return names, stats, gp
+
+
+def per_game_stats(stats: np.ndarray, gp: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(PER_GAME, stats / gp[:, None], stats)
+
+
+def whatif_tensors(stats: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Category wins and losses of every team (rows) against every opponent (columns)
+    oriented = stats * DIRECTION
+    team = oriented[:, None, :]
+    opp = oriented[None, :, :]
+    return (team > opp).sum(axis=2), (team < opp).sum(axis=2)
+
+
+def whatif_table(names: List[str], win: np.ndarray, lose: np.ndarray) -> Tuple[List, List, List]:
+    n_cats = len(STAT_KEYS)
+    outcome = np.sign(win - lose)
+    score = outcome.sum(axis=1)
+
+    # Stable sort on descending score, same as sorted(..., reverse=True)
+    sort_order = np.argsort(-score, kind="stable")
+    grid = np.ix_(sort_order, sort_order)
+    outcome = outcome[grid].tolist()
+    win = win[grid].tolist()
+    lose = lose[grid].tolist()
+    score = score[sort_order].tolist()
+
+    what_if_win = []
+    what_if_cats = []
+    for row, i in enumerate(sort_order.tolist()):
+        what_if_win.append([names[i]] + outcome[row] + [score[row]])
+        what_if_cats.append([names[i]] + [f"{w}={l}={(n_cats-w-l)}" for w, l in zip(win[row], lose[row])])
+
+    return what_if_win, what_if_cats, sort_order.tolist()
+
+
+def calc_whatifs(data: Union[Dict, TeamWeek]) -> Tuple[List, List, List, List, List, List]:
+    names, stats, gp = pack_stats(data)
+
+    what_if_win, what_if_cats, sort_order = whatif_table(names, *whatif_tensors(stats))
+    what_if_win_pg, what_if_cats_pg, sort_order_pg = whatif_table(names, *whatif_tensors(per_game_stats(stats, gp)))
+
+    return (what_if_win, what_if_cats, what_if_win_pg, what_if_cats_pg, sort_order, sort_order_pg)
+
+
+def greedy_flips(w_diffs: np.ndarray, gains: np.ndarray, need: np.ndarray) -> np.ndarray:
+    # Flip losing/tied categories cheapest first (ties broken by category order) until the pair is won
+    eligible = gains > 0
+    order = np.argsort(np.where(eligible, -w_diffs, np.inf), axis=-1, kind="stable")
+    sorted_gains = np.take_along_axis(gains, order, axis=-1)
+    picked = (np.cumsum(sorted_gains, axis=-1) - sorted_gains) < need[..., None]
+    flips = np.zeros_like(picked)
+    np.put_along_axis(flips, order, picked & (sorted_gains > 0), axis=-1)
+    return flips
+
+
+def exact_flips(w_diffs: np.ndarray, gains: np.ndarray, need: np.ndarray) -> np.ndarray:
+    # Minimum weighted cost set of flips reaching `need`, a 0/1 knapsack small enough to enumerate
+    eligible = gains > 0
+    cost = np.where(eligible, -w_diffs, 0) @ SUBSETS.T
+    reach = gains @ SUBSETS.T
+    allowed = (~eligible).astype(int) @ SUBSETS.T == 0
+    cost = np.where(allowed & (reach >= need[..., None]), cost, np.inf)
+    return SUBSETS[np.argmin(cost, axis=-1)]
+
+
+def calc_mvp(data: Union[Dict, TeamWeek], sort_order: List, stat_keys: List[str]=STAT_KEYS, exact: bool=False) -> Dict:
+    names, stats, _ = pack_stats(data, stat_keys)
+    scaled = stats * MVP_SCALE
+
+    # Pairwise scaled differences of every team (rows) against every opponent (columns)
+    diffs = scaled[:, None, :] - scaled[None, :, :]
+    w_diffs = diffs * MVP_WEIGHTS
+    wl = np.sign(diffs)
+    gains = 1 - wl
+    need = np.maximum(1 - wl.sum(axis=-1), 0)
+
+    flips = (exact_flips if exact else greedy_flips)(w_diffs, gains, need)
+    flips &= (np.array(names)[:, None] != np.array(names)[None, :])[..., None]
+
+    # A category's requirement only grows when an opponent needs more than already recorded
+    required = np.zeros(stats.shape)
+    for j in range(len(names)):
+        grow = flips[:, j, :] & (-diffs[:, j, :] > required)
+        required = np.where(grow, np.round(-diffs[:, j, :] + 1, 1), required)
+
+    return {names[i]: required[i].tolist() for i in sort_order}
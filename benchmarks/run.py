@@ -0,0 +1,152 @@
+# Offline timings for the analytics hot paths.
+#
+#   python -m benchmarks.run --compare benchmarks/baseline.json
+#
+# fails when a case got slower or larger than the committed baseline by more than --tolerance. After an
+# intended change in performance, or on new reference hardware, refresh the baseline with the defaults:
+#
+#   python -m benchmarks.run --save benchmarks/baseline.json
+#
+# and commit it alongside the change.
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, Iterator, List, Tuple
+from FantasyAPI import scoreboard_to_dict
+from NBAStats import NBAStats
+from analytics import calc_whatifs, calc_mvp
+from fantasy_scoreboard import agg_season_data
+from gamelog_index import GamelogIndex
+from gamelog_views import build_player_agg
+from storage import write_table, write_manifest
+from yahoo_xml import XMLNS, iter_players
+from benchmarks import synthetic
+import players_data
+
+PREFIX = "default:"
+NAMESPACES = {"default": XMLNS}
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# A case counts as regressed when it is this much slower, or uses this much more memory, than the baseline
+TOLERANCE = 0.25
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    # Best of `repeat` wall times, then one separate traced run for peak memory
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(times), "peak_bytes": peak}
+
+
+def scoreboard_cases(n_teams: int, n_weeks: int) -> Iterator[Tuple[str, Callable]]:
+    xml = synthetic.scoreboard_xml(n_teams)
+    weeks = synthetic.league_weeks(n_teams, n_weeks)
+    data = weeks[-1]
+    sort_order = calc_whatifs(data)[4]
+
+    def parse_scoreboard():
+        scoreboard = ET.fromstring(xml).find(f"{PREFIX}league", NAMESPACES).find(f"{PREFIX}scoreboard", NAMESPACES)
+        return scoreboard_to_dict(scoreboard, PREFIX, NAMESPACES)
+
+    yield f"scoreboard_to_dict[teams={n_teams}]", parse_scoreboard
+    yield f"calc_whatifs[teams={n_teams}]", lambda: calc_whatifs(data)
+    yield f"calc_mvp[teams={n_teams}]", lambda: calc_mvp(data, sort_order)
+    yield f"calc_mvp_exact[teams={n_teams}]", lambda: calc_mvp(data, sort_order, exact=True)
+    yield f"agg_season_data[teams={n_teams},weeks={n_weeks}]", lambda: agg_season_data(weeks)
+
+
+def player_cases(n_players: int, n_games: int, n_teams: int, directory: str) -> Iterator[Tuple[str, Callable]]:
+    xml = synthetic.players_xml(n_players, n_teams)
+    gamelogs = synthetic.gamelog_frame(n_players, n_games)
+    lookup = {f"418.p.{1000 + i}": i + 1 for i in range(n_players)}
+    stats = NBAStats(lookup, "2022-23", gamelogs=gamelogs)
+    denorm = synthetic.denorm_frame(n_players, n_games, n_teams)
+
+    # The players page reads the tables the ETL writes, so write synthetic ones and load them the same way
+    write_table(denorm, "DENORM", directory)
+    write_table(build_player_agg(denorm), "PLAYER_AGG", directory)
+    write_manifest(["DENORM", "PLAYER_AGG"], directory)
+    players_data.load_views(directory)
+
+    def players_page():
+        # The page's three callbacks for one dropdown change, with the per-selection cache cold
+        players_data.filtered_rows.cache_clear()
+        sort_by = [{"column_id": "PTS", "direction": "desc"}]
+        players_data.dropdown_data("NBA Team 3", None, "freeagents", 14)
+        players_data.gamelog_page(0, 20, sort_by, None, "NBA Team 3", None, "freeagents", 14)
+        players_data.player_page(0, 20, sort_by, None, "NBA Team 3", None, "freeagents", 14)
+
+    yield f"iter_players[players={n_players}]", lambda: sum(1 for _ in iter_players([xml]))
+    yield f"NBAStats.build_index[players={n_players},games={n_games}]", lambda: NBAStats(lookup, "2022-23", gamelogs=gamelogs)
+    yield f"NBAStats.get_player_gamelogs[players={n_players},games={n_games}]", \
+        lambda: [stats.get_player_gamelogs(pid, 30) for pid in lookup]
+    yield f"GamelogIndex[players={n_players},games={n_games}]", lambda: GamelogIndex(denorm)
+    yield f"players_page[players={n_players},games={n_games}]", players_page
+
+
+def run(teams: List[int], weeks: int, players: int, games: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cases = [case for n_teams in teams for case in scoreboard_cases(n_teams, weeks)]
+        cases.extend(player_cases(players, games, max(teams), directory))
+        for name, fn in cases:
+            results[name] = measure(fn, repeat)
+            print(f"{name:<60} {results[name]['seconds'] * 1000:>10.2f} ms {results[name]['peak_bytes'] / 2**20:>10.2f} MiB")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            before, after = baseline[name][metric], result[metric]
+            if before > 0 and after > before * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {before:.6g} -> {after:.6g} ({after / before - 1:+.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the fantasy analytics hot paths on synthetic leagues, offline.")
+    parser.add_argument("--teams", type=int, nargs="+", default=[8, 12, 16, 32], help="league sizes (default: %(default)s)")
+    parser.add_argument("--weeks", type=int, default=20, help="season length in weeks (default: %(default)s)")
+    parser.add_argument("--players", type=int, default=500, help="NBA players (default: %(default)s)")
+    parser.add_argument("--games", type=int, default=60, help="games per player (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case, the best is kept (default: %(default)s)")
+    parser.add_argument("--save", metavar="PATH", help=f"write the results as a baseline, e.g. {BASELINE}")
+    parser.add_argument("--compare", metavar="PATH", help=f"fail if any case regressed against this baseline, e.g. {BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown ratio (default: %(default)s)")
+    args = parser.parse_args()
+
+    results = run(args.teams, args.weeks, args.players, args.games, args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from typing import List
+from yahoo_xml import XMLNS, stat_map, iter_scoreboard_teams
+from TeamWeek import TeamWeek
+from gamelog_views import DISPLAY_COLUMNS
+from storage import SCHEMAS, apply_schema
+
+# Per-game box score columns of an NBA gamelog
+BOX_COLUMNS = ["MIN", "PTS", "FGM", "FGA", "FG3M", "FG3A", "FTM", "FTA", "OREB", "DREB",
+               "REB", "AST", "TOV", "STL", "BLK", "BLKA", "PF", "PFD", "PLUS_MINUS"]
+
+OWNERSHIP_TYPES = ["team", "freeagents", "waivers"]
+
+
+def team_stats(rng: np.random.Generator, games: int) -> List[str]:
+    # A week of plausible category totals, in Yahoo's stat order
+    fga = int(rng.integers(70, 90) * games / 2)
+    fgm = int(fga * rng.uniform(0.42, 0.52))
+    fta = int(rng.integers(18, 30) * games / 2)
+    ftm = int(fta * rng.uniform(0.7, 0.85))
+    values = {"fgma": f"{fgm}/{fga}",
+              "fgp": f"{fgm / fga:.3f}".lstrip("0"),
+              "ftma": f"{ftm}/{fta}",
+              "ftp": f"{ftm / fta:.3f}".lstrip("0"),
+              "tpm": int(rng.integers(10, 16) * games / 2),
+              "pts": 2 * fgm + ftm,
+              "reb": int(rng.integers(40, 50) * games / 2),
+              "ast": int(rng.integers(20, 30) * games / 2),
+              "st": int(rng.integers(6, 10) * games / 2),
+              "blk": int(rng.integers(4, 7) * games / 2),
+              "to": int(rng.integers(12, 16) * games / 2)}
+    return [f"<stat><stat_id>{stat_id}</stat_id><value>{values[key]}</value></stat>" for stat_id, key in stat_map.items()]
+
+
+def team_xml(rng: np.random.Generator, game_key: str, league_id: int, team_id: int) -> str:
+    games = int(rng.integers(20, 40))
+    return (f"<team><team_key>{game_key}.l.{league_id}.t.{team_id}</team_key><team_id>{team_id}</team_id>"
+            f"<name>Team {team_id}</name>"
+            f"<team_stats><coverage_type>week</coverage_type><stats>{''.join(team_stats(rng, games))}</stats></team_stats>"
+            f"<team_remaining_games><total><remaining_games>{int(rng.integers(0, 10))}</remaining_games>"
+            f"<live_games>0</live_games><completed_games>{games}</completed_games></total></team_remaining_games>"
+            f"</team>")
+
+
+def scoreboard_xml(n_teams: int, week: int = 1, seed: int = 0, game_key: str = "418", league_id: int = 1) -> bytes:
+    # A league scoreboard response with n_teams / 2 head to head matchups
+    rng = np.random.default_rng([seed, week])
+    matchups = []
+    for first in range(1, n_teams + 1, 2):
+        teams = "".join(team_xml(rng, game_key, league_id, team_id) for team_id in (first, first + 1))
+        matchups.append(f"<matchup><week>{week}</week><teams count=\"2\">{teams}</teams></matchup>")
+    return (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><fantasy_content xmlns=\"{XMLNS}\"><league>"
+            f"<league_key>{game_key}.l.{league_id}</league_key><league_id>{league_id}</league_id>"
+            f"<scoreboard><week>{week}</week><matchups count=\"{len(matchups)}\">{''.join(matchups)}</matchups></scoreboard>"
+            f"</league></fantasy_content>").encode("utf8")
+
+
+def players_xml(n_players: int, n_teams: int = 12, seed: int = 0, game_key: str = "418", league_id: int = 1) -> bytes:
+    # A players;out=ownership response holding n_players players
+    rng = np.random.default_rng(seed)
+    players = []
+    for i in range(n_players):
+        ownership_type = OWNERSHIP_TYPES[int(rng.integers(0, 3))]
+        owner = ""
+        if ownership_type == "team":
+            team_id = int(rng.integers(1, n_teams + 1))
+            owner = f"<owner_team_key>{game_key}.l.{league_id}.t.{team_id}</owner_team_key><owner_team_name>Team {team_id}</owner_team_name>"
+        players.append(f"<player><player_key>{game_key}.p.{1000 + i}</player_key><player_id>{1000 + i}</player_id>"
+                       f"<name><full>First{i} Last{i}</full><first>First{i}</first><last>Last{i}</last></name>"
+                       f"<editorial_team_full_name>NBA Team {i % 30}</editorial_team_full_name>"
+                       f"<editorial_team_abbr>T{i % 30}</editorial_team_abbr><uniform_number>{i % 100}</uniform_number>"
+                       f"<display_position>PG,SG</display_position>"
+                       f"<ownership><ownership_type>{ownership_type}</ownership_type>{owner}</ownership></player>")
+    return (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><fantasy_content xmlns=\"{XMLNS}\"><league>"
+            f"<players count=\"{n_players}\">{''.join(players)}</players></league></fantasy_content>").encode("utf8")
+
+
+def league_weeks(n_teams: int, n_weeks: int, seed: int = 0) -> List[TeamWeek]:
+    return [TeamWeek.from_records(iter_scoreboard_teams([scoreboard_xml(n_teams, week, seed)])) for week in range(1, n_weeks + 1)]
+
+
+def gamelog_frame(n_players: int, n_games: int, seed: int = 0, end: date = None) -> pd.DataFrame:
+    # n_games per player, one every other day up to `end`, shaped like PlayerGameLogs output
+    rng = np.random.default_rng(seed)
+    end = end or date.today()
+    n = n_players * n_games
+    dates = [end - timedelta(days=2 * (n_games - 1 - g)) for g in range(n_games)]
+
+    df = pd.DataFrame({"SEASON_YEAR": "2022-23",
+                       "PLAYER_ID": np.repeat(np.arange(1, n_players + 1), n_games),
+                       "TEAM_ID": np.repeat(np.arange(n_players) % 30 + 1, n_games),
+                       "GAME_ID": [f"002220{g:04d}" for g in np.tile(np.arange(n_games), n_players)],
+                       "GAME_DATE": [f"{d.isoformat()}T00:00:00" for d in dates] * n_players,
+                       "WL": rng.choice(["W", "L"], n)})
+    for col in BOX_COLUMNS:
+        df[col] = rng.integers(0, 40, n)
+    df["FG_PCT"] = np.where(df["FGA"] > 0, df["FGM"] / df["FGA"].clip(lower=1), 0)
+    df["FG3_PCT"] = np.where(df["FG3A"] > 0, df["FG3M"] / df["FG3A"].clip(lower=1), 0)
+    df["FT_PCT"] = np.where(df["FTA"] > 0, df["FTM"] / df["FTA"].clip(lower=1), 0)
+    df["NBA_FANTASY_PTS"] = rng.uniform(0, 60, n)
+
+    # Shuffle, as the API doesn't return rows grouped by player
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def denorm_frame(n_players: int, n_games: int, n_teams: int = 12, seed: int = 0) -> pd.DataFrame:
+    # The players page's joined DENORM table for synthetic gamelogs
+    rng = np.random.default_rng(seed)
+    df = gamelog_frame(n_players, n_games, seed)
+    ownership_type = np.array(OWNERSHIP_TYPES)[rng.integers(0, 3, n_players)]
+    owner_name = np.where(ownership_type == "team", [f"Team {t}" for t in rng.integers(1, n_teams + 1, n_players)], "")
+
+    player = df["PLAYER_ID"].to_numpy() - 1
+    df["player_first_name"] = [f"First{i}" for i in player]
+    df["player_last_name"] = [f"Last{i}" for i in player]
+    df["position"] = "PG,SG"
+    df["TEAM_NAME"] = [f"NBA Team {i % 30}" for i in player]
+    df["ownership_type"] = ownership_type[player]
+    df["owner_name"] = owner_name[player]
+    return apply_schema(df[DISPLAY_COLUMNS], SCHEMAS["DENORM"])
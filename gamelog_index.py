@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+def full_names(df: pd.DataFrame) -> pd.Series:
+    return df.player_first_name.astype(str) + " " + df.player_last_name.astype(str)
+
+
+def owner_labels(df: pd.DataFrame) -> pd.Series:
+    # Rostered players are labelled by fantasy team, the rest by freeagents/waivers
+    return df.owner_name.astype(object).where(df.owner_name.notna(), df.ownership_type.astype(object))
+
+
+class CategoryIndex:
+    # Row positions for every value of a column, each list ascending so they can be intersected and sliced
+    def __init__(self, values: pd.Series):
+        categorical = pd.Categorical(values)
+        self.labels = [str(label) for label in categorical.categories]
+        self.codes = categorical.codes
+
+        order = np.argsort(self.codes, kind="stable")
+        bounds = np.searchsorted(self.codes[order], np.arange(len(self.labels) + 1))
+        self.positions = {label: order[bounds[i]:bounds[i + 1]] for i, label in enumerate(self.labels)}
+
+    def lookup(self, label: str) -> np.ndarray:
+        return self.positions.get(label, np.empty(0, dtype=np.intp))
+
+    def options(self, positions: Optional[np.ndarray] = None) -> List[str]:
+        # Labels present among the given rows, in sorted order
+        if positions is None:
+            return self.labels
+        codes = np.unique(self.codes[positions])
+        return [self.labels[code] for code in codes if code >= 0]
+
+
+class GamelogIndex:
+    # Built once per data version; answers dashboard filters without scanning or re-joining the frame
+    def __init__(self, denorm: pd.DataFrame):
+        frame = denorm.sort_values("GAME_DATE", kind="stable").reset_index(drop=True)
+        frame["player_name"] = full_names(frame)
+        frame["owner_label"] = owner_labels(frame)
+        self.frame = frame
+
+        self.dates = frame.GAME_DATE.to_numpy()
+        self.teams = CategoryIndex(frame.TEAM_NAME)
+        self.players = CategoryIndex(frame.player_name)
+        self.owners = CategoryIndex(frame.owner_label)
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def positions(self,
+                  team_name: Optional[str] = None,
+                  player_name: Optional[str] = None,
+                  owner: Optional[str] = None,
+                  since: Optional[datetime] = None) -> np.ndarray:
+        # Rows are in date order, so the window is a single slice off the front
+        start = np.searchsorted(self.dates, np.datetime64(since), side="left") if since else 0
+        positions = None
+        for index, label in ((self.teams, team_name), (self.players, player_name), (self.owners, owner)):
+            if not label:
+                continue
+            matches = index.lookup(label)
+            positions = matches if positions is None else np.intersect1d(positions, matches, assume_unique=True)
+
+        if positions is None:
+            return np.arange(start, len(self.frame))
+        return positions[np.searchsorted(positions, start):]
+
+    def query(self, **filters) -> pd.DataFrame:
+        return self.frame.iloc[self.positions(**filters)]
+
+    def options(self, positions: Optional[np.ndarray] = None) -> Dict[str, List[str]]:
+        return {"team": self.teams.options(positions),
+                "player": self.players.options(positions),
+                "owner": self.owners.options(positions)}
+
+
+# DataTable filter_query operators, longest spellings first as in the Dash docs
+FILTER_OPERATORS = [["ge ", ">="],
+                    ["le ", "<="],
+                    ["lt ", "<"],
+                    ["gt ", ">"],
+                    ["ne ", "!="],
+                    ["eq ", "="],
+                    ["contains "],
+                    ["datestartswith "]]
+
+
+def split_filter_part(filter_part: str):
+    for operator_type in FILTER_OPERATORS:
+        for operator in operator_type:
+            if operator not in filter_part:
+                continue
+            name_part, value_part = filter_part.split(operator, 1)
+            name = name_part[name_part.find("{") + 1: name_part.rfind("}")]
+
+            value_part = value_part.strip()
+            v0 = value_part[0] if value_part else ""
+            if v0 and v0 == value_part[-1] and v0 in ("'", '"', "`"):
+                value = value_part[1: -1].replace("\\" + v0, v0)
+            else:
+                try:
+                    value = float(value_part)
+                except ValueError:
+                    value = value_part
+
+            # Word operators are what the table sends back, whichever spelling was typed
+            return name, operator_type[0].strip(), value
+
+    return None, None, None
+
+
+def filter_table(df: pd.DataFrame, filter_query: Optional[str]) -> pd.DataFrame:
+    if not filter_query:
+        return df
+
+    mask = np.ones(len(df), dtype=bool)
+    for part in filter_query.split(" && "):
+        col, operator, value = split_filter_part(part)
+        if col not in df.columns:
+            continue
+        series = df[col].astype("string") if df[col].dtype == "category" else df[col]
+        try:
+            if operator in ("eq", "ne", "lt", "le", "gt", "ge"):
+                matches = getattr(series, operator)(value)
+            elif operator == "contains":
+                matches = series.astype("string").str.contains(str(value), regex=False)
+            else:
+                matches = series.astype("string").str.startswith(str(value))
+        except TypeError:
+            # e.g. text typed into a numeric column
+            return df.iloc[:0]
+        mask &= matches.to_numpy(dtype=bool, na_value=False)
+
+    return df.loc[mask]
+
+
+def sort_table(df: pd.DataFrame, sort_by: Optional[List[Dict]]) -> pd.DataFrame:
+    sort_by = [col for col in sort_by or [] if col["column_id"] in df.columns]
+    if not sort_by:
+        return df
+    return df.sort_values([col["column_id"] for col in sort_by],
+                          ascending=[col["direction"] == "asc" for col in sort_by],
+                          kind="stable")
+
+
+def table_page(df: pd.DataFrame,
+               page_current: Optional[int],
+               page_size: int,
+               sort_by: Optional[List[Dict]] = None,
+               filter_query: Optional[str] = None,
+               columns: Optional[List[str]] = None) -> Tuple[List[Dict], int]:
+    # Filter, sort and slice server side so only the visible page is serialised
+    df = sort_table(filter_table(df, filter_query), sort_by)
+    page_count = max(-(-len(df) // page_size), 1)
+    page = min(page_current or 0, page_count - 1)
+    df = df.iloc[page * page_size: (page + 1) * page_size]
+    return (df if columns is None else df[columns]).to_dict("records"), page_count
@@ -0,0 +1,85 @@
+import pandas as pd
+import numpy as np
+
+DISPLAY_COLUMNS = [
+    "SEASON_YEAR",
+    "GAME_DATE",
+    "player_first_name",
+    "player_last_name",
+    "position",
+    "TEAM_NAME",
+    "WL",
+    "MIN",
+    "PTS",
+    "FGM",
+    "FGA",
+    "FG_PCT",
+    "FG3M",
+    "FG3A",
+    "FG3_PCT",
+    "FTM",
+    "FTA",
+    "FT_PCT",
+    "OREB",
+    "DREB",
+    "REB",
+    "AST",
+    "TOV",
+    "STL",
+    "BLK",
+    "BLKA",
+    "PF",
+    "PFD",
+    "PLUS_MINUS",
+    "NBA_FANTASY_PTS",
+    "owner_name",
+    "ownership_type"
+]
+
+DISPLAY_AGG_COLUMNS = [
+    "player_first_name",
+    "player_last_name",
+    "MIN",
+    "FG_PCT",
+    "FT_PCT",
+    "FG3M",
+    "PTS",
+    "REB",
+    "AST",
+    "TOV",
+    "STL",
+    "BLK",
+    "NBA_FANTASY_PTS"
+]
+
+
+def build_denorm(f_gamelogs: pd.DataFrame, d_player: pd.DataFrame, d_game: pd.DataFrame, d_team: pd.DataFrame) -> pd.DataFrame:
+    denorm = (f_gamelogs.merge(d_player, on="PLAYER_ID", how="inner", suffixes=["","_d"])
+                        .merge(d_game, on="GAME_ID", how="inner", suffixes=["","_d"])
+                        .merge(d_team, on="TEAM_ID", how="inner", suffixes=["","_d"]))
+
+    return denorm[DISPLAY_COLUMNS]
+
+
+def build_player_agg(denorm: pd.DataFrame) -> pd.DataFrame:
+    player_agg = (denorm.groupby(["player_first_name", "player_last_name"])
+                        .agg({"MIN": "mean",
+                              "FGM": "sum",
+                              "FGA": "sum",
+                              "FTM": "sum",
+                              "FTA": "sum",
+                              "FG3M": "mean",
+                              "PTS": "mean",
+                              "REB": "mean",
+                              "AST": "mean",
+                              "STL": "mean",
+                              "BLK": "mean",
+                              "TOV": "mean",
+                              "NBA_FANTASY_PTS": "mean"})
+                        .reset_index())
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        player_agg["FG_PCT"] = np.where(player_agg["FGA"] == 0, 0, player_agg["FGM"] / player_agg["FGA"])
+        player_agg["FT_PCT"] = np.where(player_agg["FTA"] == 0, 0, player_agg["FTM"] / player_agg["FTA"])
+
+    return player_agg[DISPLAY_AGG_COLUMNS]
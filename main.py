@@ -1,6 +1,12 @@
 from Authenticator import Authenticator
 from FantasyAPI import FantasyAPI
 from NBAStats import NBAStats
+from ResponseCache import ResponseCache
+from TokenStore import TokenStore
+from NameResolver import NameResolver
+from storage import write_table, write_manifest
+from gamelog_views import build_denorm, build_player_agg
+from projection import project_week
 import csv
 import os
 import pandas as pd
@@ -9,41 +15,44 @@ import matplotlib.pyplot as plt
 
 REFRESH_ID = False
 LOOKUP_FILE = "./data/nba/all_players.csv"
+REVIEW_FILE = "./data/nba/unmatched_players.csv"
+GAMELOG_STORE = "./data/nba/gamelogs_2022-23.csv"
+EXPORT_CSV = False
+PROJECT_WEEK = True
+PROJECTION_DIR = "./data/projections"
 
 def main():
 
-    # Set up Yahoo authentication
-    try:
-        with open("REFRESH_TOKEN", "r") as f:
-            refresh_token = f.readline()
-    except FileNotFoundError:
-        print("No refresh token!")
-        refresh_token = None
-
+    # Set up Yahoo authentication, reusing the persisted token when it is still valid
     print("Setting up authenticator...")
     authenticator = Authenticator(client_id=os.getenv('YAHOO_CLIENT_ID'),
                                   client_secret=os.getenv('YAHOO_CLIENT_SECRET'),
-                                  refresh_token=refresh_token,
+                                  refresh_token=None,
                                   auth_url="https://api.login.yahoo.com/oauth2/request_auth",
-                                  access_token_url="https://api.login.yahoo.com/oauth2/get_token")
-                                  
-    # Write new REFRESH_TOKEN to file for future use.
-    with open("REFRESH_TOKEN", "w") as f:
-        f.write(authenticator.refresh_token)
+                                  access_token_url="https://api.login.yahoo.com/oauth2/get_token",
+                                  token_store=TokenStore())
 
     print("Setting up Fantasy API...")
-    yahoo_fantasy = FantasyAPI(81070, 2022, authenticator)
+    yahoo_fantasy = FantasyAPI(81070, 2022, authenticator, cache=ResponseCache())
     
     if REFRESH_ID:
+        exact, inexact, _ = NameResolver().resolve_players(yahoo_fantasy.players)
+        nba_ids = {**exact, **inexact}
+
         player_lookup = []
         for player in yahoo_fantasy.players:
-            player.nba_player_id = player.get_nba_player_id()
+            player.nba_player_id = nba_ids.get(player.fantasy_player_id, 0)
             player_lookup.append({"fantasy_player_id": player.fantasy_player_id,
                                   "player_first_name": player.player_first_name,
                                   "player_last_name": player.player_last_name,
                                   "nba_player_id": int(player.nba_player_id)})
         df_player_lookup = pd.DataFrame(player_lookup)
         df_player_lookup.to_csv(LOOKUP_FILE, index=False)
+
+        # Inexact and missing matches go alongside the lookup to be checked by hand
+        df_review = df_player_lookup[~df_player_lookup.fantasy_player_id.isin(exact.keys())].copy()
+        df_review["match"] = np.where(df_review.fantasy_player_id.isin(inexact.keys()), "inexact", "unresolved")
+        df_review.to_csv(REVIEW_FILE, index=False)
         
     with open(LOOKUP_FILE, 'r') as f:
         reader = csv.reader(f)
@@ -52,7 +61,7 @@ def main():
      
     # Get NBA Stats
     print("Setting up stats...")
-    stats = NBAStats(id_lookup, "2022-23")
+    stats = NBAStats(id_lookup, "2022-23", store_path=GAMELOG_STORE)
     
     # Set NBA Player IDs based on lookup
     for player in yahoo_fantasy.players:
@@ -62,18 +71,34 @@ def main():
     player_df = pd.DataFrame(yahoo_fantasy.players)
     player_df["PLAYER_ID"] = player_df["nba_player_id"]
     player_df_cols = ["PLAYER_ID"]+[col for col in list(player_df.columns) if col not in ["PLAYER_ID", "nba_player_id"]]
-    player_df[player_df_cols].to_csv("./data/nba/D_PLAYER.csv", index=False)
+    d_player = write_table(player_df[player_df_cols], "D_PLAYER", csv=EXPORT_CSV)
 
     # D_TEAM
-    stats.gamelogs[["TEAM_ID", "TEAM_ABBREVIATION", "TEAM_NAME"]].drop_duplicates().to_csv("./data/nba/D_TEAM.csv", index=False)    
+    d_team = write_table(stats.gamelogs[["TEAM_ID", "TEAM_ABBREVIATION", "TEAM_NAME"]].drop_duplicates(), "D_TEAM", csv=EXPORT_CSV)
 
     # D_GAME
-    stats.gamelogs[["GAME_ID", "GAME_DATE"]].drop_duplicates().to_csv("./data/nba/D_GAME.csv", index=False) 
+    d_game = write_table(stats.gamelogs[["GAME_ID", "GAME_DATE"]].drop_duplicates(), "D_GAME", csv=EXPORT_CSV)
     
     # F_GAMELOGS
-    F_GAMELOGS_COLS = [col for col in list(stats.gamelogs.columns) if col not in ["TEAM_ABBREVIATION", "TEAM_NAME", "PLAYER_NAME", "NICKNAME", "GAME_DATE", "MATCHUP", "DD2", "TD3", "WNBA_FANTASY_PTS", "VIDEO_AVAILABLE_FLAG"]]
+    F_GAMELOGS_COLS = [col for col in list(stats.gamelogs.columns) if col not in ["TEAM_ABBREVIATION", "TEAM_NAME", "PLAYER_NAME", "NICKNAME", "GAME_DATE", "GAME_DATETIME", "MATCHUP", "DD2", "TD3", "WNBA_FANTASY_PTS", "VIDEO_AVAILABLE_FLAG"]]
     F_GAMELOGS_COLS = [col for col in F_GAMELOGS_COLS if "RANK" not in col]
-    stats.gamelogs[F_GAMELOGS_COLS].to_csv("./data/nba/F_GAMELOGS.csv", index=False)
+    f_gamelogs = write_table(stats.gamelogs[F_GAMELOGS_COLS], "F_GAMELOGS", csv=EXPORT_CSV)
+
+    # DENORM & PLAYER_AGG, pre-joined so the dashboard never joins per request
+    denorm = write_table(build_denorm(f_gamelogs, d_player, d_game, d_team), "DENORM", csv=EXPORT_CSV)
+    write_table(build_player_agg(denorm), "PLAYER_AGG", csv=EXPORT_CSV)
+
+    write_manifest(["D_PLAYER", "D_TEAM", "D_GAME", "F_GAMELOGS", "DENORM", "PLAYER_AGG"])
+
+    # Project the week in progress from its scoreboard so far; rerunning during the week refreshes it
+    if PROJECT_WEEK:
+        print("Projecting matchups...")
+        game_key = yahoo_fantasy.get_game_key()
+        week = yahoo_fantasy.get_current_week(game_key) + 1
+        data, matchups = yahoo_fantasy.get_matchups(game_key, week)
+        projection = project_week(stats, yahoo_fantasy.players, data, matchups, processes=os.cpu_count())
+        os.makedirs(PROJECTION_DIR, exist_ok=True)
+        projection.to_csv(f"{PROJECTION_DIR}/week_{week}.csv", index=False)
 
     my_players = filter(lambda x: x.owner_name == "Should we get a Marvin Bagley?", yahoo_fantasy.players)
     healthy_free_agents = list(filter(lambda x: x.ownership_type == "freeagents" and x.status == "", yahoo_fantasy.players))
@@ -2,11 +2,31 @@ import dash
 from dash import Dash, dash_table, dcc, html, Input, Output, callback
 import pandas as pd
 import numpy as np
+import json
+import os
+import re
+from functools import lru_cache
 from math import floor
 from pathlib import Path
+from typing import Dict, List, Tuple
+from report import REPORT_JSON
 
 dash.register_page(__name__)
 
+DATA_PATH = Path("./data/fantasy/")
+WEEK_FILES = {"results": "1_Results.csv",
+              "cat_winners": "2_Cat_Winners.csv",
+              "what_if_cats": "3_WhatIf_Cats.csv",
+              "what_if_wl": "4_WhatIf_WL.csv",
+              "mvp": "MVP.csv"}
+HEATMAP_COLUMNS = ["fgp", "ftp", "tpm", "pts", "reb", "ast", "st", "blk", "to", "gp"]
+
+# Weeks kept parsed and styled in memory
+CACHE_SIZE = 16
+
+# Report directories; anything else under DATA_PATH (other leagues, the season store's files) is skipped
+REPORT_DIR = re.compile(r"week_(\d+)|season_avg")
+
 def colour_scale(start, mid, end, steps=64):
     colours = ['rgb'+str(start)]
     
@@ -36,57 +56,145 @@ colour_scale = colour_scale((250, 128, 114),
                             (240, 230, 140),
                             (127, 255, 212))
 
-def heatmap_column(df, col, rev=False, n_bins=64):
-    bounds = [i * (1.0 / n_bins) for i in range(n_bins + 1)]
-    col_max = df[col].max()
-    col_min = df[col].min()
-    ranges = [
-        ((col_max - col_min) * i) + col_min
-        for i in bounds
-    ]
+def heatmap_styles(df, cols, rev_cols=(), n_bins=64):
+    # Bin every cell of every column in one pass, then emit rules only for the bins that occur
+    bounds = np.arange(n_bins + 1) * (1.0 / n_bins)
+    values = df[cols].to_numpy(dtype=float)
+    col_min = np.nanmin(values, axis=0)
+    col_max = np.nanmax(values, axis=0)
+    ranges = ((col_max - col_min) * bounds[:, None]) + col_min
+
+    # Bin i covers [ranges[i-1], ranges[i]), the last one is closed above
+    bins = (values[None, :, :] >= ranges[1:-1, None, :]).sum(axis=0) + 1
+
     styles = []
-    legend = []
-    for i in range(1, len(bounds)):
-        min_bound = ranges[i - 1]
-        max_bound = ranges[i]
-        if rev:
-            backgroundColor = colour_scale[len(bounds)- i - 1]
-        else:
-            backgroundColor = colour_scale[i - 1]
-        color = 'white' if i > len(bounds) / 2. else 'inherit'
-
-        styles.append({
-            'if': {
-                'filter_query': (
-                    '{{{column}}} >= {min_bound}' +
-                    (' && {{{column}}} < {max_bound}' if (i < len(bounds) - 1) else '')
-                ).format(column=col, min_bound=min_bound, max_bound=max_bound),
-                'column_id': col
-            },
-            'backgroundColor': backgroundColor,
-            'color': color
-        })
+    for j, col in enumerate(cols):
+        for i in np.unique(bins[~np.isnan(values[:, j]), j]).tolist():
+            if col in rev_cols:
+                backgroundColor = colour_scale[len(bounds)- i - 1]
+            else:
+                backgroundColor = colour_scale[i - 1]
+            color = 'white' if i > len(bounds) / 2. else 'inherit'
+
+            styles.append({
+                'if': {
+                    'filter_query': (
+                        '{{{column}}} >= {min_bound}' +
+                        (' && {{{column}}} < {max_bound}' if (i < len(bounds) - 1) else '')
+                    ).format(column=col, min_bound=float(ranges[i - 1, j]), max_bound=float(ranges[i, j])),
+                    'column_id': col
+                },
+                'backgroundColor': backgroundColor,
+                'color': color
+            })
     return styles
+
+
+def heatmap_column(df, col, rev=False, n_bins=64):
+    return heatmap_styles(df, [col], [col] if rev else [], n_bins)
     
 
-def layout():
+def win_lose_styles(columns: List[str]) -> List[Dict]:
+    return ([{
+                "if": {
+                    "column_id": col,
+                    "filter_query": f"{{{col}}} = 1"                            
+                },
+                "backgroundColor": "aquamarine",
+                "color": "darkgreen"
+            } for col in columns if col not in ["team","score"]]+
+            [{
+                "if": {
+                    "column_id": col,
+                    "filter_query": f"{{{col}}} = 0"                            
+                },
+                "backgroundColor": "khaki",
+                "color": "goldenrod"
+            } for col in columns if col not in ["team","score"]]+
+            [{
+                "if": {
+                    "column_id": col,
+                    "filter_query": f"{{{col}}} = -1"                            
+                },
+                "backgroundColor": "salmon",
+                "color": "firebrick"
+            } for col in columns if col not in ["team","score"]])
 
-    data_path = Path("./data/fantasy/")
-    weeks = [week.name for week in data_path.iterdir()]
-    max_week = max([int(week.split('_')[1]) for week in weeks if "week" in week])
 
-    results = pd.read_csv(f"./data/fantasy/week_{max_week}/1_Results.csv")
-    cat_winners = pd.read_csv(f"./data/fantasy/week_{max_week}/2_Cat_Winners.csv")
-    what_if_cats = pd.read_csv(f"./data/fantasy/week_{max_week}/3_WhatIf_Cats.csv")
-    what_if_wl = pd.read_csv(f"./data/fantasy/week_{max_week}/4_WhatIf_WL.csv")
-    mvp = pd.read_csv(f"./data/fantasy/week_{max_week}/MVP.csv")
-    
-    col_styles = []
-    for col in ["fgp", "ftp", "tpm", "pts", "reb", "ast", "st", "blk", "to", "gp"]:
-        if col == "to":
-            col_styles.extend(heatmap_column(results,col, True))
+def week_paths(week: str) -> List[Path]:
+    # Weeks written with the columnar report need one file, older weeks the five CSVs
+    report = DATA_PATH / week / REPORT_JSON
+    if report.exists():
+        return [report]
+    return [DATA_PATH / week / name for name in WEEK_FILES.values()]
+
+
+def week_mtimes(week: str) -> Tuple[int, ...]:
+    return tuple(os.stat(path).st_mtime_ns for path in week_paths(week))
+
+
+def unique_columns(columns: List[str]) -> List[str]:
+    # Same renaming read_csv applies to repeated headers, e.g. two teams with the same name
+    seen = {}
+    output = []
+    for col in columns:
+        if col in seen:
+            seen[col] += 1
+            col = f"{col}.{seen[col]}"
         else:
-            col_styles.extend(heatmap_column(results,col))
+            seen[col] = 0
+        output.append(col)
+    return output
+
+
+def read_week(week: str) -> Dict[str, pd.DataFrame]:
+    paths = week_paths(week)
+    if len(paths) == len(WEEK_FILES):
+        return {key: pd.read_csv(path) for key, path in zip(WEEK_FILES, paths)}
+
+    with open(paths[0]) as f:
+        report = json.load(f)
+    frames = {}
+    for key in WEEK_FILES:
+        table = report[key]
+        df = pd.DataFrame(dict(enumerate(table["data"])), columns=range(len(table["columns"])))
+        df.columns = unique_columns(table["columns"])
+        frames[key] = df
+    return frames
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def build_week(week: str, mtimes: Tuple[int, ...]) -> Dict:
+    # Keyed on the file mtimes as well, so a rerun of the weekly job misses the cache
+    frames = read_week(week)
+
+    week_data = {"frames": frames,
+                 "results_styles": heatmap_styles(frames["results"], HEATMAP_COLUMNS, ["to"]),
+                 "what_if_wl_styles": win_lose_styles(frames["what_if_wl"].columns)}
+    for key, df in frames.items():
+        week_data[key] = df.to_dict("records")
+        week_data[f"{key}_columns"] = [{"name": i, "id": i} for i in df.columns]
+    return week_data
+
+
+def load_week(week: str) -> Dict:
+    return build_week(week, week_mtimes(week))
+
+
+def report_dirs() -> List[str]:
+    return [path.name for path in DATA_PATH.iterdir() if path.is_dir() and REPORT_DIR.fullmatch(path.name)]
+
+
+def layout():
+
+    weeks = report_dirs() if DATA_PATH.is_dir() else []
+    if not weeks:
+        return html.Div(children=[html.H1(children="NBA Fantasy Stats",),
+                                  html.P(children="No reports yet, run fantasy_scoreboard.py first")])
+
+    week_numbers = [int(REPORT_DIR.fullmatch(week).group(1)) for week in weeks if week.startswith("week_")]
+    default_week = f"week_{max(week_numbers)}" if week_numbers else weeks[0]
+    week_data = load_week(default_week)
 
     return html.Div(
         children=[
@@ -100,7 +208,7 @@ def layout():
                     {"label": week, "value": week}
                     for week in sorted(weeks)
                 ],
-                value=f"week_{max_week}",
+                value=default_week,
                 clearable=False,
                 className="dropdown"
             ),
@@ -108,13 +216,13 @@ def layout():
             html.Div(children=[
                 html.H2(children="Results",),
                 dash_table.DataTable(
-                    results.to_dict('records'),
-                    [{"name": i, "id": i} for i in results.columns],
+                    week_data["results"],
+                    week_data["results_columns"],
                     id='tbl_results',
                     style_cell={
                         "textAlign": "center"
                     },
-                    style_data_conditional=col_styles
+                    style_data_conditional=week_data["results_styles"]
                 ),
             ],
             style={
@@ -124,8 +232,8 @@ def layout():
             html.Div(children=[
                 html.H2(children="Cat Winners",),
                 dash_table.DataTable(
-                    cat_winners.to_dict('records'),
-                    [{"name": i, "id": i} for i in cat_winners.columns],
+                    week_data["cat_winners"],
+                    week_data["cat_winners_columns"],
                     id='tbl_cat_winners',
                     style_cell={
                         "textAlign": "center"
@@ -139,11 +247,11 @@ def layout():
             html.Div(children=[
                 html.H2(children="What If Win/Lose",),
                 dash_table.DataTable(
-                    what_if_wl.to_dict('records'),
-                    [{"name": i, "id": i} for i in what_if_wl.columns],
+                    week_data["what_if_wl"],
+                    week_data["what_if_wl_columns"],
                     id='tbl_what_if_wl',
                     tooltip_header={
-                        col: col for col in what_if_cats.columns
+                        col: col for col in week_data["frames"]["what_if_cats"].columns
                     },
                     style_header={
                         "overflow": "hidden",
@@ -153,31 +261,7 @@ def layout():
                         "font-size": 10,
                         "textAlign": "center"
                     },
-                    style_data_conditional=
-                        [{
-                            "if": {
-                                "column_id": col,
-                                "filter_query": f"{{{col}}} = 1"                            
-                            },
-                            "backgroundColor": "aquamarine",
-                            "color": "darkgreen"
-                        } for col in what_if_wl.columns if col not in ["team","score"]]+
-                        [{
-                            "if": {
-                                "column_id": col,
-                                "filter_query": f"{{{col}}} = 0"                            
-                            },
-                            "backgroundColor": "khaki",
-                            "color": "goldenrod"
-                        } for col in what_if_wl.columns if col not in ["team","score"]]+
-                        [{
-                            "if": {
-                                "column_id": col,
-                                "filter_query": f"{{{col}}} = -1"                            
-                            },
-                            "backgroundColor": "salmon",
-                            "color": "firebrick"
-                        } for col in what_if_wl.columns if col not in ["team","score"]]
+                    style_data_conditional=week_data["what_if_wl_styles"]
                 )
             ],
             style={
@@ -187,11 +271,11 @@ def layout():
             html.Div(children=[
                 html.H2(children="What If Cats",),
                 dash_table.DataTable(
-                    what_if_cats.to_dict('records'),
-                    [{"name": i, "id": i} for i in what_if_cats.columns],
+                    week_data["what_if_cats"],
+                    week_data["what_if_cats_columns"],
                     id='tbl_what_if_cats',
                     tooltip_header={
-                        col: col for col in what_if_cats.columns
+                        col: col for col in week_data["frames"]["what_if_cats"].columns
                     },
                     style_header={
                         "overflow": "hidden",
@@ -210,8 +294,8 @@ def layout():
             html.Div(children=[
                 html.H2(children="Minimum Victory Path (MVP)",),
                 dash_table.DataTable(
-                    mvp.to_dict('records'),
-                    [{"name": i, "id": i} for i in mvp.columns],
+                    week_data["mvp"],
+                    week_data["mvp_columns"],
                     id='tbl_mvp',
                     style_header={
                         "overflow": "hidden",
@@ -244,56 +328,16 @@ def layout():
     [Input("week_dropdown", "value")]
 )
 def load_stats_week(week_num: str):
-    results = pd.read_csv(f"./data/fantasy/{week_num}/1_Results.csv")
-    cat_winners = pd.read_csv(f"./data/fantasy/{week_num}/2_Cat_Winners.csv")
-    what_if_cats = pd.read_csv(f"./data/fantasy/{week_num}/3_WhatIf_Cats.csv")
-    what_if_wl = pd.read_csv(f"./data/fantasy/{week_num}/4_WhatIf_WL.csv")
-    mvp = pd.read_csv(f"./data/fantasy/{week_num}/MVP.csv")
-    
-    WIWL_style_cond = (
-        [{
-            "if": {
-                "column_id": col,
-                "filter_query": f"{{{col}}} = 1"                            
-            },
-            "backgroundColor": "aquamarine",
-            "color": "darkgreen"
-        } for col in what_if_wl.columns if col not in ["team","score"]]+
-        [{
-            "if": {
-                "column_id": col,
-                "filter_query": f"{{{col}}} = 0"                            
-            },
-            "backgroundColor": "khaki",
-            "color": "goldenrod"
-        } for col in what_if_wl.columns if col not in ["team","score"]]+
-        [{
-            "if": {
-                "column_id": col,
-                "filter_query": f"{{{col}}} = -1"                            
-            },
-            "backgroundColor": "salmon",
-            "color": "firebrick"
-        } for col in what_if_wl.columns if col not in ["team","score"]]
-    )
-    
-    col_styles = []
-    for col in ["fgp", "ftp", "tpm", "pts", "reb", "ast", "st", "blk", "to", "gp"]:
-        if col == "to":
-            col_styles.extend(heatmap_column(results,col, True))
-        else:
-            col_styles.extend(heatmap_column(results,col))
-    
-    return (results.to_dict("records"),
-            [{"name": i, "id": i} for i in results.columns],
-            cat_winners.to_dict("records"),
-            [{"name": i, "id": i} for i in cat_winners.columns],
-            what_if_cats.to_dict("records"),
-            [{"name": i, "id": i} for i in what_if_cats.columns],
-            what_if_wl.to_dict("records"),
-            [{"name": i, "id": i} for i in what_if_wl.columns],
-            mvp.to_dict("records"),
-            [{"name": i, "id": i} for i in mvp.columns],
-            WIWL_style_cond,
-            col_styles)
-            
\ No newline at end of file
+    week_data = load_week(week_num)
+    return (week_data["results"],
+            week_data["results_columns"],
+            week_data["cat_winners"],
+            week_data["cat_winners_columns"],
+            week_data["what_if_cats"],
+            week_data["what_if_cats_columns"],
+            week_data["what_if_wl"],
+            week_data["what_if_wl_columns"],
+            week_data["mvp"],
+            week_data["mvp_columns"],
+            week_data["what_if_wl_styles"],
+            week_data["results_styles"])
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 import pandas as pd
 from typing import Optional, List, Any, Dict
-from nba_api.stats.static.players import find_players_by_full_name
+from NameResolver import NameResolver
 
 
 @dataclass
@@ -19,17 +19,7 @@ class Player:
     owner_name: str
     nba_player_id: Optional[int] = None
 
-    def get_nba_player_id(self):
-        try:
-            player_results = find_players_by_full_name(f"{self.player_first_name} {self.player_last_name}")
-            if len(player_results) == 0:
-                raise(Exception("Player Not Found!"))
-            return player_results[0]["id"]
-        except Exception as e:
-            player_results = find_players_by_full_name(
-                f"{self.player_first_name.replace('.', '')} {self.player_last_name}")
-            if len(player_results) == 0:
-                print(self)
-                return 0
-            else:
-                return player_results[0]["id"]
+    def get_nba_player_id(self, resolver: Optional[NameResolver] = None) -> int:
+        # Prefer NameResolver.resolve_players for a whole roster; this builds the index each call
+        resolver = resolver or NameResolver()
+        return resolver.resolve(f"{self.player_first_name} {self.player_last_name}") or 0
@@ -0,0 +1,105 @@
+from functools import lru_cache
+from datetime import datetime, timedelta, date, time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from storage import DATA_DIR, read_table, read_version
+from gamelog_views import DISPLAY_COLUMNS, build_denorm, build_player_agg
+from gamelog_index import GamelogIndex, table_page
+
+# The players page's data and callback bodies, kept free of dash so they can be benchmarked as they run
+
+# Pre-joined tables written by the ETL, reloaded only when a new run lands
+DIRECTORY = DATA_DIR
+DATA_VERSION = None
+DENORM = None
+PLAYER_AGG = None
+INDEX = None
+
+
+def load_views(directory: Optional[str] = None):
+    global DIRECTORY
+    global DATA_VERSION
+    global DENORM
+    global PLAYER_AGG
+    global INDEX
+
+    # Later calls without a directory keep reading from the last one given
+    if directory is not None:
+        DIRECTORY = directory
+    directory = DIRECTORY
+
+    version = read_version(directory)
+    if DENORM is not None and version == DATA_VERSION:
+        return
+
+    if version is None:
+        # Data from before the ETL wrote the joined tables
+        DENORM = build_denorm(read_table("F_GAMELOGS", directory), read_table("D_PLAYER", directory),
+                              read_table("D_GAME", directory), read_table("D_TEAM", directory))
+        PLAYER_AGG = build_player_agg(DENORM)
+    else:
+        DENORM = read_table("DENORM", directory)
+        PLAYER_AGG = read_table("PLAYER_AGG", directory)
+    INDEX = GamelogIndex(DENORM)
+    DATA_VERSION = version
+
+
+@lru_cache(maxsize=64)
+def filtered_rows(version, team_name, player_name, fantasy_team_name, since):
+    # The dropdowns drive three callbacks; resolve each combination once per data version
+    positions = INDEX.positions(team_name=team_name, player_name=player_name, owner=fantasy_team_name, since=since)
+    if len(positions) == len(INDEX):
+        return positions, PLAYER_AGG
+    return positions, build_player_agg(INDEX.frame.iloc[positions])
+
+
+def dropdown_filter(team_name, player_name, fantasy_team_name, window) -> Tuple[np.ndarray, pd.DataFrame]:
+    load_views()
+    since = datetime.combine(date.today(), time()) - timedelta(days=window) if window else None
+    return filtered_rows(DATA_VERSION, team_name or None, player_name or None, fantasy_team_name or None, since)
+
+
+def gamelog_page(page_current, page_size, sort_by, filter_query, team_name, player_name, fantasy_team_name, window) -> Tuple[List[Dict], int]:
+    positions, _ = dropdown_filter(team_name, player_name, fantasy_team_name, window)
+    return table_page(INDEX.frame.iloc[positions], page_current, page_size, sort_by, filter_query, DISPLAY_COLUMNS)
+
+
+def player_page(page_current, page_size, sort_by, filter_query, team_name, player_name, fantasy_team_name, window) -> Tuple[List[Dict], int]:
+    _, player_agg = dropdown_filter(team_name, player_name, fantasy_team_name, window)
+    return table_page(player_agg, page_current, page_size, sort_by, filter_query)
+
+
+def dropdown_data(team_name, player_name, fantasy_team_name, window) -> List:
+    # Dropdown options narrowed to the selection, then the averages shown in the summary cards
+    positions, _ = dropdown_filter(team_name, player_name, fantasy_team_name, window)
+    DENORM_filtered = INDEX.frame.iloc[positions]
+
+    options = INDEX.options(positions)
+    team_options = [
+        {"label": team, "value": team}
+        for team in options["team"]
+    ]
+
+    player_options = [
+        {"label": player_name, "value": player_name}
+        for player_name in options["player"]
+    ]
+
+    fantasy_team_options = [
+        {"label": team, "value": team}
+        for team in options["owner"]
+    ]
+
+    return [team_options,
+            player_options,
+            fantasy_team_options,
+            f"{DENORM_filtered.PTS.agg('mean'):.2f}",
+            f"{DENORM_filtered.REB.agg('mean'):.2f}",
+            f"{DENORM_filtered.AST.agg('mean'):.2f}",
+            f"{DENORM_filtered.FGM.agg('sum')/DENORM_filtered.FGA.agg('sum'):.2%}",
+            f"{DENORM_filtered.FTM.agg('sum')/DENORM_filtered.FTA.agg('sum'):.2%}",
+            f"{DENORM_filtered.FG3M.agg('mean'):.2f}",
+            f"{DENORM_filtered.STL.agg('mean'):.2f}",
+            f"{DENORM_filtered.BLK.agg('mean'):.2f}",
+            f"{DENORM_filtered.TOV.agg('mean'):.2f}"]
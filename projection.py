@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+from analytics import STAT_KEYS, DIRECTION
+from NBAStats import NBAStats
+from TeamWeek import TeamWeek
+from player import Player
+
+# Gamelog columns sampled for each simulated game
+SIM_COLUMNS = ["FGM", "FGA", "FTM", "FTA", "FG3M", "PTS", "REB", "AST", "STL", "BLK", "TOV"]
+
+# Simulations are drawn in chunks to bound the size of the sampled (sims, games, stats) tensor
+CHUNK_SIMS = 4096
+
+
+class TeamPool:
+    # Every rostered player's gamelogs stacked into one matrix, with how many games each still plays
+    def __init__(self, rows: np.ndarray, offsets: np.ndarray, sizes: np.ndarray, games: np.ndarray):
+        self.rows = rows
+        self.offsets = offsets
+        self.sizes = sizes
+        self.games = games
+
+
+def team_id(team_key: str) -> str:
+    # Yahoo team keys look like 418.l.39438.t.5, scoreboards are keyed by the trailing id
+    return team_key.rsplit(".t.", 1)[-1]
+
+
+def remaining_games(team) -> int:
+    # Scoreboard dicts may lack the field; TeamWeek records always carry it
+    try:
+        return int(team["remaining"])
+    except KeyError:
+        return 0
+
+
+def split_games(remaining: int, sizes: np.ndarray) -> np.ndarray:
+    # Without a schedule, spread the team's remaining player-games evenly across its roster,
+    # giving the spare games to the players with the most recent games
+    games = np.zeros(len(sizes), dtype=int)
+    if len(sizes) == 0 or remaining <= 0:
+        return games
+    games += remaining // len(sizes)
+    games[np.argsort(-sizes, kind="stable")[:remaining % len(sizes)]] += 1
+    return games
+
+
+def build_pools(stats: NBAStats,
+                players: List[Player],
+                data: Union[Dict, TeamWeek],
+                window: Optional[int] = 30,
+                games_remaining: Optional[Dict[str, int]] = None) -> Dict[str, TeamPool]:
+    rosters = {}
+    for player in players:
+        if player.owner_id:
+            rosters.setdefault(team_id(player.owner_id), []).append(player.fantasy_player_id)
+
+    pools = {}
+    for tid, team in data.items():
+        roster = rosters.get(tid, [])
+        gamelogs = [stats.get_player_gamelogs(pid, window)[SIM_COLUMNS].to_numpy(dtype=float) for pid in roster]
+        player_ids = [pid for pid, logs in zip(roster, gamelogs) if len(logs)]
+        gamelogs = [logs for logs in gamelogs if len(logs)]
+
+        sizes = np.array([len(logs) for logs in gamelogs], dtype=int)
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(int) if len(sizes) else sizes
+        if games_remaining is not None:
+            games = np.array([games_remaining.get(pid, 0) for pid in player_ids], dtype=int)
+        else:
+            games = split_games(remaining_games(team), sizes)
+        rows = np.vstack(gamelogs) if gamelogs else np.zeros((0, len(SIM_COLUMNS)))
+        pools[tid] = TeamPool(rows, offsets, sizes, games)
+
+    return pools
+
+
+def simulate_totals(pools: Dict[str, TeamPool], n_sims: int, seed) -> Dict[str, np.ndarray]:
+    # Bootstrap each remaining game from the player's own gamelogs and sum them per simulation
+    rng = np.random.default_rng(seed)
+    totals = {}
+    for tid, pool in pools.items():
+        sizes = np.repeat(pool.sizes, pool.games)
+        offsets = np.repeat(pool.offsets, pool.games)
+        total = np.zeros((n_sims, len(SIM_COLUMNS)))
+        if len(sizes):
+            for start in range(0, n_sims, CHUNK_SIMS):
+                n = min(CHUNK_SIMS, n_sims - start)
+                idx = offsets + (rng.random((n, len(sizes))) * sizes).astype(int)
+                total[start:start + n] = pool.rows[idx].sum(axis=1)
+        totals[tid] = total
+    return totals
+
+
+def category_totals(team: Dict, sims: np.ndarray) -> np.ndarray:
+    # Combine the week so far with the simulated remainder into the scoring categories
+    fgm, fga = (int(x) for x in team["fgma"].split("/"))
+    ftm, fta = (int(x) for x in team["ftma"].split("/"))
+    s = dict(zip(SIM_COLUMNS, sims.T))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fgp = np.nan_to_num((fgm + s["FGM"]) / (fga + s["FGA"]))
+        ftp = np.nan_to_num((ftm + s["FTM"]) / (fta + s["FTA"]))
+    return np.column_stack([fgp,
+                            ftp,
+                            team["tpm"] + s["FG3M"],
+                            team["pts"] + s["PTS"],
+                            team["reb"] + s["REB"],
+                            team["ast"] + s["AST"],
+                            team["st"] + s["STL"],
+                            team["blk"] + s["BLK"],
+                            team["to"] + s["TOV"]])
+
+
+def project_week(stats: NBAStats,
+                 players: List[Player],
+                 data: Union[Dict, TeamWeek],
+                 matchups: List[Tuple[str, ...]],
+                 n_sims: int = 20000,
+                 window: Optional[int] = 30,
+                 games_remaining: Optional[Dict[str, int]] = None,
+                 processes: Optional[int] = None,
+                 seed: Optional[int] = None) -> pd.DataFrame:
+    pools = build_pools(stats, players, data, window, games_remaining)
+
+    # Split the simulations across processes with independent random streams
+    if processes and processes > 1:
+        seeds = np.random.SeedSequence(seed).spawn(processes)
+        chunks = [n_sims // processes + (i < n_sims % processes) for i in range(processes)]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            parts = list(executor.map(simulate_totals, [pools] * processes, chunks, seeds))
+        sims = {tid: np.vstack([part[tid] for part in parts]) for tid in pools}
+    else:
+        sims = simulate_totals(pools, n_sims, seed)
+
+    cats = {tid: category_totals(data[tid], sims[tid]) * DIRECTION for tid in pools}
+
+    rows = []
+    for matchup in matchups:
+        for tid in matchup:
+            for opp in matchup:
+                if opp == tid:
+                    continue
+                wins = cats[tid] > cats[opp]
+                losses = cats[tid] < cats[opp]
+                won = wins.sum(axis=1)
+                lost = losses.sum(axis=1)
+                row = {"team": data[tid]["name"], "opponent": data[opp]["name"]}
+                row.update(zip(STAT_KEYS, wins.mean(axis=0)))
+                row["win"] = (won > lost).mean()
+                row["tie"] = (won == lost).mean()
+                row["loss"] = (won < lost).mean()
+                rows.append(row)
+
+    return pd.DataFrame(rows, columns=["team", "opponent"] + STAT_KEYS + ["win", "tie", "loss"])
@@ -0,0 +1,91 @@
+import json
+import os
+import numpy as np
+from typing import Dict, List, Union
+from analytics import MVP_SCALE, pack_stats
+from TeamWeek import TeamWeek, STAT_KEYS
+
+RESULTS_COLUMNS = ["name", "fgma", "fgp", "ftma", "ftp", "tpm", "pts", "reb", "ast", "st", "blk", "to", "gp"]
+
+# CSV written for each table, keyed the same way in the columnar report.json
+REPORT_FILES = {"results": "1_Results.csv",
+                "cat_winners": "2_Cat_Winners.csv",
+                "what_if_cats": "3_WhatIf_Cats.csv",
+                "what_if_wl": "4_WhatIf_WL.csv",
+                "what_if_cats_pg": "5_WhatIf_Cats_pg.csv",
+                "what_if_wl_pg": "6_WhatIf_WL_pg.csv",
+                "mvp": "MVP.csv"}
+REPORT_JSON = "report.json"
+
+
+def cat_winners(names: List[str], stats: np.ndarray, stat_keys: List[str]) -> List[List]:
+    # Highest value wins (lowest for turnovers); ties list every tied team in data order
+    oriented = np.where(np.array(stat_keys) == "to", -stats, stats)
+    winners = oriented == oriented.max(axis=0)
+    first = winners.argmax(axis=0)
+    return [[key, " | ".join(name for name, won in zip(names, winners[:, j]) if won), float(stats[first[j], j])]
+            for j, key in enumerate(stat_keys)]
+
+
+def whatif_rows(rows: List[List], score: bool) -> Dict:
+    columns = ["team"] + [row[0] for row in rows] + (["score"] if score else [])
+    return {"columns": columns, "rows": rows}
+
+
+def report_tables(data: Union[Dict, TeamWeek],
+                  what_if_win: List,
+                  what_if_cats: List,
+                  what_if_win_pg: List,
+                  what_if_cats_pg: List,
+                  mvp: Dict,
+                  sort_order: List,
+                  stat_keys: List[str] = STAT_KEYS) -> Dict[str, Dict]:
+    teams = list(data.values())
+    names, stats, _ = pack_stats(data, stat_keys)
+
+    results = [[names[i]] + [teams[i][col] for col in RESULTS_COLUMNS[1:]] for i in sort_order]
+    mvp_values = (np.array(list(mvp.values()), dtype=float).reshape(len(mvp), len(stat_keys)) / MVP_SCALE).tolist()
+
+    return {"results": {"columns": RESULTS_COLUMNS, "rows": results},
+            "cat_winners": {"columns": ["stat", "winner", "val"], "rows": cat_winners(names, stats, stat_keys)},
+            "what_if_cats": whatif_rows(what_if_cats, False),
+            "what_if_wl": whatif_rows(what_if_win, True),
+            "what_if_cats_pg": whatif_rows(what_if_cats_pg, False),
+            "what_if_wl_pg": whatif_rows(what_if_win_pg, True),
+            "mvp": {"columns": ["team"] + stat_keys, "rows": [[name] + row for name, row in zip(mvp, mvp_values)]}}
+
+
+def table_csv(table: Dict) -> str:
+    lines = [",".join(table["columns"])]
+    lines.extend(",".join(str(x) for x in row) for row in table["rows"])
+    return "\n".join(lines) + "\n"
+
+
+def write_report(dirname: str,
+                 data: Union[Dict, TeamWeek],
+                 what_if_win: List,
+                 what_if_cats: List,
+                 what_if_win_pg: List,
+                 what_if_cats_pg: List,
+                 mvp: Dict,
+                 sort_order: List,
+                 stat_keys: List[str] = STAT_KEYS,
+                 columnar: bool = False) -> Dict[str, Dict]:
+    tables = report_tables(data, what_if_win, what_if_cats, what_if_win_pg, what_if_cats_pg, mvp, sort_order, stat_keys)
+
+    for key, filename in REPORT_FILES.items():
+        with open(os.path.join(dirname, filename), "w") as f:
+            f.write(table_csv(tables[key]))
+
+    if columnar:
+        # Every table in one file, stored by column so readers can build frames without parsing CSV
+        report = {key: {"columns": table["columns"], "data": [list(col) for col in zip(*table["rows"])]}
+                  for key, table in tables.items()}
+        # Written to a temporary file and swapped in, so the dashboard never reads a partial report
+        path = os.path.join(dirname, REPORT_JSON)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(report, f)
+        os.replace(tmp, path)
+
+    return tables
@@ -0,0 +1,115 @@
+import json
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Dict, List, Optional
+
+DATA_DIR = "./data/nba"
+
+# Explicit dtypes for the star-schema tables so readers never re-infer them
+SCHEMAS = {
+    "D_PLAYER": {"PLAYER_ID": "int64",
+                 "fantasy_player_id": "string",
+                 "player_first_name": "string",
+                 "player_last_name": "string",
+                 "team_name": "category",
+                 "team_abbr": "category",
+                 "position": "category",
+                 "status": "category",
+                 "ownership_type": "category",
+                 "owner_id": "category",
+                 "owner_name": "category"},
+    "D_TEAM": {"TEAM_ID": "int64",
+               "TEAM_ABBREVIATION": "category",
+               "TEAM_NAME": "category"},
+    "D_GAME": {"GAME_ID": "string",
+               "GAME_DATE": "datetime64[ns]"},
+    "F_GAMELOGS": {"SEASON_YEAR": "category",
+                   "PLAYER_ID": "int64",
+                   "TEAM_ID": "int64",
+                   "GAME_ID": "string",
+                   "WL": "category"},
+    "DENORM": {"SEASON_YEAR": "category",
+               "GAME_DATE": "datetime64[ns]",
+               "player_first_name": "string",
+               "player_last_name": "string",
+               "position": "category",
+               "TEAM_NAME": "category",
+               "WL": "category",
+               "owner_name": "category",
+               "ownership_type": "category"},
+    "PLAYER_AGG": {"player_first_name": "string",
+                   "player_last_name": "string"},
+}
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == "datetime64[ns]":
+            df[col] = pd.to_datetime(df[col])
+            continue
+        if dtype in ("string", "category"):
+            # Empty strings become missing, as they would after a CSV round trip
+            df[col] = df[col].replace("", None)
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def table_path(name: str, directory: str = DATA_DIR, ext: str = "parquet") -> str:
+    return os.path.join(directory, f"{name}.{ext}")
+
+
+def write_table(df: pd.DataFrame, name: str, directory: str = DATA_DIR, csv: bool = False) -> pd.DataFrame:
+    df = apply_schema(df.reset_index(drop=True), SCHEMAS.get(name, {}))
+    os.makedirs(directory, exist_ok=True)
+
+    # Write next to the target and swap it in, so readers never see a partial file
+    path = table_path(name, directory)
+    tmp = f"{path}.tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp)
+    os.replace(tmp, path)
+
+    if csv:
+        df.to_csv(table_path(name, directory, "csv"), index=False)
+
+    return df
+
+
+def write_manifest(tables: List[str], directory: str = DATA_DIR) -> str:
+    # One version id for a full ETL run, so readers can tell when every table changed together
+    version = uuid.uuid4().hex
+    path = os.path.join(directory, "MANIFEST.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": version, "tables": tables}, f)
+    os.replace(f"{path}.tmp", path)
+    return version
+
+
+def read_version(directory: str = DATA_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, "MANIFEST.json"), encoding="utf-8") as f:
+            return json.load(f)["version"]
+    except FileNotFoundError:
+        return None
+
+
+def read_table(name: str,
+               directory: str = DATA_DIR,
+               columns: Optional[List[str]] = None,
+               filters: Optional[List] = None,
+               memory_map: bool = True) -> pd.DataFrame:
+    # filters use pyarrow's DNF form, e.g. [("TEAM_ID", "=", 1610612747)]
+    path = table_path(name, directory)
+    if os.path.exists(path):
+        return pq.read_table(path, columns=columns, filters=filters, memory_map=memory_map).to_pandas()
+
+    # Fall back to a CSV export from before the columnar backend
+    df = apply_schema(pd.read_csv(table_path(name, directory, "csv"), usecols=columns), SCHEMAS.get(name, {}))
+    if filters:
+        df = pa.Table.from_pandas(df, preserve_index=False).filter(pq.filters_to_expression(filters)).to_pandas()
+    return df
@@ -0,0 +1,109 @@
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+XMLNS = "http://fantasysports.yahooapis.com/fantasy/v2/base.rng"
+NS = "{" + XMLNS + "}"
+
+stat_map = {9004003: "fgma",
+            5: "fgp",
+            9007006: "ftma",
+            8: "ftp",
+            10: "tpm",
+            12: "pts",
+            15: "reb",
+            16: "ast",
+            17: "st",
+            18: "blk",
+            19: "to"}
+
+# Paths are namespaced once here rather than per lookup
+COMPLETED_GAMES = f"{NS}team_remaining_games/{NS}total/{NS}completed_games"
+REMAINING_GAMES = f"{NS}team_remaining_games/{NS}total/{NS}remaining_games"
+MATCHUP_TEAMS = f"{NS}teams/{NS}team"
+TEAM_STATS = f"{NS}team_stats"
+STATS = f"{NS}team_stats/{NS}stats"
+STAT_ID = f"{NS}stat_id"
+VALUE = f"{NS}value"
+
+
+class TagTable(dict):
+    # Maps a namespaced tag to its local name, computing each one only once
+    def __missing__(self, tag: str) -> str:
+        local = tag.rsplit("}", 1)[-1]
+        self[tag] = local
+        return local
+
+
+TAGS = TagTable()
+
+
+def iter_elements(chunks: Iterable[bytes], tag: str) -> Iterator[ET.Element]:
+    # Yield each completed `tag` element as soon as it has been parsed, then drop it
+    parser = ET.XMLPullParser(events=("start", "end"))
+    target = NS + tag
+    stack = []
+
+    def drain() -> Iterator[ET.Element]:
+        for event, elem in parser.read_events():
+            if event == "start":
+                stack.append(elem)
+                continue
+            stack.pop()
+            if elem.tag == target:
+                yield elem
+                if stack:
+                    stack[-1].remove(elem)
+                elem.clear()
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
+
+
+def player_record(elem: ET.Element) -> Dict[str, str]:
+    record = {}
+    nested = {}
+    for child in elem:
+        tag = TAGS[child.tag]
+        if tag in ("name", "ownership"):
+            for item in child:
+                nested[TAGS[item.tag]] = item.text
+        else:
+            record[tag] = child.text
+    record.update(nested)
+    return record
+
+
+def team_record(elem: ET.Element) -> Tuple[str, Dict]:
+    tmp = {}
+    tmp["name"] = elem.find(f"{NS}name").text
+    tmp["team_stats"] = elem.find(TEAM_STATS).text
+    # Past seasons and some final weeks have no team_remaining_games block; per game stats treat gp 0 as missing
+    tmp["gp"] = int(elem.findtext(COMPLETED_GAMES, default="0"))
+    tmp["remaining"] = int(elem.findtext(REMAINING_GAMES, default="0"))
+
+    for stat in elem.find(STATS):
+        key = stat_map[int(stat.find(STAT_ID).text)]
+        if key in ("fgma", "ftma"):
+            tmp[key] = stat.find(VALUE).text
+        else:
+            tmp[key] = float(stat.find(VALUE).text)
+
+    return elem.find(f"{NS}team_id").text, tmp
+
+
+def iter_players(chunks: Iterable[bytes]) -> Iterator[Dict[str, str]]:
+    for elem in iter_elements(chunks, "player"):
+        yield player_record(elem)
+
+
+def iter_scoreboard_teams(chunks: Iterable[bytes]) -> Iterator[Tuple[str, Dict]]:
+    for elem in iter_elements(chunks, "team"):
+        yield team_record(elem)
+
+
+def iter_matchups(chunks: Iterable[bytes]) -> Iterator[List[Tuple[str, Dict]]]:
+    for elem in iter_elements(chunks, "matchup"):
+        yield [team_record(team) for team in elem.iterfind(MATCHUP_TEAMS)]